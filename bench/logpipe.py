@@ -0,0 +1,102 @@
+"""How many log messages per second the Tk activity log sustains without stalling.
+
+Needs a display (use xvfb-run on a headless box). Run from the repo root:
+    python -m bench.logpipe
+"""
+import threading
+import time
+import tkinter as tk
+from tkinter import scrolledtext
+
+from logpipe import LogPipeline
+
+RATES = (100, 1000, 10000, 50000)
+DURATION = 2.0
+HEARTBEAT_MS = 10
+
+
+def make_widget(root):
+    widget = scrolledtext.ScrolledText(root, width=80, height=15, font=("Consolas", 9))
+    widget.pack()
+    for level in ("INFO", "SUCCESS", "WARNING", "ERROR"):
+        widget.tag_config(level)
+    return widget
+
+
+def legacy_rate(root, widget, count=2000):
+    """The old per-line path: three inserts, see() and update_idletasks() per message."""
+    start = time.perf_counter()
+    for i in range(count):
+        widget.insert(tk.END, "[00:00:00] ", "timestamp")
+        widget.insert(tk.END, "[INFO] ", "INFO")
+        widget.insert(tk.END, f"message {i}\n")
+        widget.see(tk.END)
+        root.update_idletasks()
+    return count / (time.perf_counter() - start)
+
+
+def pipeline_run(root, widget, rate):
+    """Push ``rate`` messages/s from a worker for DURATION seconds while Tk drains them.
+
+    Returns (delivered messages/s, worst heartbeat lateness in ms).
+    """
+    widget.delete(1.0, tk.END)
+    pipeline = LogPipeline(root, widget)
+    delivered = [0]
+    worst = [0.0]
+    done = threading.Event()
+
+    original_drain = pipeline.drain
+
+    def counting_drain():
+        count = original_drain()
+        delivered[0] += count
+        return count
+
+    pipeline.drain = counting_drain
+
+    def worker():
+        interval = 1.0 / rate
+        start = time.perf_counter()
+        sent = 0
+        while time.perf_counter() - start < DURATION:
+            target = int((time.perf_counter() - start) / interval)
+            while sent < target:
+                pipeline.push(f"message {sent}", "INFO")
+                sent += 1
+            time.sleep(0.001)
+        done.set()
+
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        worst[0] = max(worst[0], (now - last[0]) * 1000 - HEARTBEAT_MS)
+        last[0] = now
+        if done.is_set() and pipeline.records.empty():
+            root.quit()
+        else:
+            root.after(HEARTBEAT_MS, heartbeat)
+
+    pipeline.start()
+    start = time.perf_counter()
+    threading.Thread(target=worker, daemon=True).start()
+    root.after(HEARTBEAT_MS, heartbeat)
+    root.mainloop()
+    pipeline.stop()
+    return delivered[0] / (time.perf_counter() - start), worst[0]
+
+
+def main():
+    root = tk.Tk()
+    widget = make_widget(root)
+    print(f"legacy per-line inserts: {legacy_rate(root, widget):10.0f} msg/s (blocks the Tk loop while inserting)")
+    for rate in RATES:
+        delivered, stall = pipeline_run(root, widget, rate)
+        print(f"pipeline @ {rate:>6} msg/s offered: {delivered:10.0f} msg/s delivered, "
+              f"worst UI stall {max(stall, 0.0):6.1f} ms")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
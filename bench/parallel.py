@@ -0,0 +1,59 @@
+"""Serial vs thread-pool matching latency per poll on a synthetic 4K screen.
+
+Run from the repo root:  python -m bench.parallel [workers ...]
+"""
+import os
+import statistics
+import sys
+import time
+
+import cv2
+
+from bench.synth import RESOLUTIONS, make_screen
+from capture import FileCapture
+from locator import Locator
+from templates import TemplateRegistry
+
+NAMES = ('play.png', 'fullscreen.png', 'out.png', 'next1.png', 'next2.png')
+REPEATS = 3
+
+
+def per_poll(locator, names):
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        locator.locate_any(names, best=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    worker_counts = [int(a) for a in argv] or sorted({2, 4, os.cpu_count() or 1})
+    templates = TemplateRegistry()
+    templates.preload()
+    width, height = RESOLUTIONS["4K"]
+    # Only the "none video" candidates are on screen, so every poll also
+    # pays for the templates that miss
+    screen, _ = make_screen(width, height, templates, ('next1.png', 'next2.png'))
+    print(f"cpu cores: {os.cpu_count()}, OpenCV threads: {cv2.getNumThreads()}")
+
+    cases = [
+        ("all templates, pyramid 1/2", NAMES, 0.5),
+        ("all templates, full res", NAMES, 1.0),
+        ("out.png alone, full res (tiled)", ('out.png',), 1.0),
+    ]
+    for label, names, pyramid in cases:
+        serial = Locator(templates, backend=FileCapture([screen]), pyramid=pyramid)
+        base = per_poll(serial, names)
+        row = f"{label:<34} serial {base * 1000:8.1f} ms"
+        for workers in worker_counts:
+            locator = Locator(templates, backend=FileCapture([screen]), pyramid=pyramid, workers=workers)
+            latency = per_poll(locator, names)
+            locator.close()
+            row += f" | {workers} workers {latency * 1000:8.1f} ms ({base / latency:.1f}x)"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Full-resolution vs coarse-to-fine matching on synthetic 1080p/1440p/4K screens.
+
+Run from the repo root:  python -m bench.pyramid
+"""
+import statistics
+import time
+
+from bench.synth import RESOLUTIONS, make_screen
+from matching import Frame, match_coarse_to_fine, match_full
+from templates import TemplateRegistry
+
+NAMES = ('play.png', 'fullscreen.png', 'out.png', 'next1.png', 'next2.png')
+SCALES = (0.5, 0.25)
+REPEATS = 3
+
+
+def timed(func, repeats=REPEATS):
+    samples = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    templates = TemplateRegistry()
+    templates.preload()
+    header = "".join(f" {'1/%d ms' % round(1 / s):>9} {'speedup':>8}" for s in SCALES)
+    print(f"{'screen':>6} {'template':>15} {'full ms':>9}{header}")
+    for label, (width, height) in RESOLUTIONS.items():
+        screen, placed = make_screen(width, height, templates, NAMES)
+        totals = [0.0] * (len(SCALES) + 1)
+        for name in NAMES:
+            template = templates.get(name)
+            full_time, _ = timed(lambda: match_full(screen, template.color))
+            totals[0] += full_time
+            row = f"{label:>6} {name:>15} {full_time * 1000:9.1f}"
+            for i, scale in enumerate(SCALES, 1):
+                # A fresh Frame per run so the downscale of the screen is part of the cost
+                pyramid_time, (score, (x, y)) = timed(
+                    lambda: match_coarse_to_fine(Frame(screen), template, 0.8, scale))
+                ok = (x, y) == placed[name][:2] and score >= 0.8
+                totals[i] += pyramid_time
+                row += f" {pyramid_time * 1000:9.1f} {full_time / pyramid_time:7.1f}x"
+                if not ok:
+                    row += " MISS"
+            print(row)
+        row = f"{label:>6} {'all templates':>15} {totals[0] * 1000:9.1f}"
+        for total in totals[1:]:
+            row += f" {total * 1000:9.1f} {totals[0] / total:7.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
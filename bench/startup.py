@@ -0,0 +1,98 @@
+"""Startup cost: import time of the heavy modules, time to the first captured
+frame, and (with a display) time until the GUI window shows and is ready.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+Run from the repo root:  python -m bench.startup [--json] [--repeats N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ("tkinter", "numpy", "cv2", "PIL.Image", "mss", "pyautogui", "engine")
+
+IMPORT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+FIRST_FRAME_SNIPPET = """
+import json, time
+start = time.perf_counter()
+from capture import create_backend
+imported = time.perf_counter()
+backend = create_backend({backend!r})
+backend.grab()
+print(json.dumps({{"import_seconds": imported - start, "seconds": time.perf_counter() - start,
+                  "backend": backend.name}}))
+"""
+
+
+def run_json(args, timeout=120):
+    """Run a child interpreter and parse the last line it prints as JSON; None on failure."""
+    try:
+        done = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    lines = done.stdout.strip().splitlines()
+    if done.returncode != 0 or not lines:
+        return None
+    return json.loads(lines[-1])
+
+
+def median_of(samples, key="seconds"):
+    values = [s[key] for s in samples if s is not None]
+    return statistics.median(values) if values else None
+
+
+def measure(repeats):
+    results = {"python": sys.version.split()[0], "imports": {}, "first_frame": {}, "gui": None}
+    for module in MODULES:
+        samples = [run_json([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)])
+                   for _ in range(repeats)]
+        results["imports"][module] = median_of(samples)
+    for backend in ("mss", "pyautogui"):
+        samples = [run_json([sys.executable, "-c", FIRST_FRAME_SNIPPET.format(backend=backend)])
+                   for _ in range(repeats)]
+        results["first_frame"][backend] = median_of(samples)
+    if os.name == "nt" or os.environ.get("DISPLAY"):
+        samples = [run_json([sys.executable, "main.py", "--startup-report"]) for _ in range(repeats)]
+        samples = [s for s in samples if s is not None and s.get("ok")]
+        if samples:
+            results["gui"] = {key: median_of(samples, key) for key in samples[0] if key.endswith("_seconds")}
+    return results
+
+
+def ms(value):
+    return "   n/a" if value is None else f"{value * 1000:6.0f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = measure(args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"python {results['python']}, median of {args.repeats} fresh interpreters (ms)")
+    for module, seconds in results["imports"].items():
+        print(f"  import {module:<12} {ms(seconds)}")
+    for backend, seconds in results["first_frame"].items():
+        print(f"  first frame {backend:<10} {ms(seconds)}")
+    if results["gui"] is None:
+        print("  GUI startup: skipped (no display or main.py failed to start)")
+    else:
+        for key, seconds in results["gui"].items():
+            print(f"  GUI {key[:-len('_seconds')]:<13} {ms(seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Benchmark suite for the locate pipeline behind wait_for_image / wait_for_any.
+
+For each matching strategy and screen resolution it measures, on synthetic
+screens with every template pasted at a known spot and on negative screens
+with none of them:
+
+- latency of a single-template locate, per template (median and p95)
+- latency and throughput of a locate_any poll over all templates
+- memory allocated during one poll (tracemalloc peak; numpy buffers are
+  traced, OpenCV's internal scratch memory is not)
+- precision and recall at several confidence thresholds
+
+Strategies cover the matching resolution (full, coarse-to-fine), the
+matching profile (color, gray, single channel, edges), the worker pool and
+remembered regions.
+
+Results are written as JSON; --compare flags latency, recall, precision
+and false-positive regressions against an earlier results file.
+
+Run from the repo root:  python -m bench.suite [--quick] [--compare OLD.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from bench.synth import RESOLUTIONS, make_background, make_screen
+from capture import FileCapture
+from locator import Locator, RegionMemory
+from templates import TemplateRegistry
+
+NAMES = ('play.png', 'fullscreen.png', 'out.png', 'next1.png', 'next2.png', 'sign_in.png')
+THRESHOLDS = (0.6, 0.7, 0.8, 0.9, 0.95)
+POSITION_TOLERANCE = 2
+
+# Strategy name -> Locator keyword arguments (memory=True gives it a fresh
+# RegionMemory, profile picks the matching profile of every template)
+STRATEGIES: Dict[str, Dict[str, Any]] = {
+    "full": dict(pyramid=1.0),
+    "full_gray": dict(pyramid=1.0, profile="gray"),
+    "pyramid_1/2": dict(pyramid=0.5),
+    "pyramid_1/2_gray": dict(pyramid=0.5, profile="gray"),
+    "pyramid_1/2_channel": dict(pyramid=0.5, profile="channel"),
+    "pyramid_1/2_edges": dict(pyramid=0.5, profile="edges"),
+    "pyramid_1/4": dict(pyramid=0.25),
+    "pyramid_1/2_workers": dict(pyramid=0.5, workers=min(4, os.cpu_count() or 1)),
+    "pyramid_1/2_roi": dict(pyramid=0.5, memory=True),
+}
+# Strategies that only change how the same search is scheduled find the same matches
+SAME_ACCURACY_AS = {"pyramid_1/2_workers": "pyramid_1/2", "pyramid_1/2_roi": "pyramid_1/2"}
+
+# Relative slowdown / absolute recall or precision drop that --compare
+# reports; any rise in false positives is reported too
+LATENCY_REGRESSION = 0.15
+ACCURACY_REGRESSION = 0.02
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+
+def timings(func, repeats: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(samples) * 1000, "p95_ms": percentile(samples, 95) * 1000}
+
+
+@lru_cache(maxsize=None)
+def registry(profile: str = "color") -> TemplateRegistry:
+    templates = TemplateRegistry(names=NAMES, default_profile=profile)
+    missing = templates.preload()
+    if missing:
+        raise SystemExit(f"Missing templates: {', '.join(missing)}")
+    return templates
+
+
+def make_locator(screen: np.ndarray, options: Dict[str, Any]) -> Locator:
+    options = dict(options)
+    memory = RegionMemory(path=None) if options.pop("memory", False) else None
+    templates = registry(options.pop("profile", "color"))
+    return Locator(templates, memory, backend=FileCapture([screen]), **options)
+
+
+def allocated_per_poll(locator: Locator) -> int:
+    locator.locate_any(NAMES)
+    tracemalloc.start()
+    try:
+        locator.locate_any(NAMES)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def accuracy(options: Dict[str, Any], positives, negatives) -> Dict[str, Any]:
+    """Precision/recall of locate() for every template at every threshold."""
+    results = {}
+    for threshold in THRESHOLDS:
+        hits = misses = wrong = false_alarms = 0
+        for screen, placed in positives:
+            locator = make_locator(screen, options)
+            for name in NAMES:
+                match = locator.locate(name, threshold)
+                if match is None:
+                    misses += 1
+                elif (abs(match.box.left - placed[name].left) <= POSITION_TOLERANCE
+                      and abs(match.box.top - placed[name].top) <= POSITION_TOLERANCE):
+                    hits += 1
+                else:
+                    wrong += 1
+            locator.close()
+        for screen in negatives:
+            locator = make_locator(screen, options)
+            false_alarms += sum(locator.locate(name, threshold) is not None for name in NAMES)
+            locator.close()
+        reported = hits + wrong + false_alarms
+        results[str(threshold)] = {
+            "recall": hits / (hits + misses + wrong),
+            "precision": hits / reported if reported else 1.0,
+            "misses": misses,
+            "wrong_position": wrong,
+            "false_positives": false_alarms,
+        }
+    return results
+
+
+def run_strategy(options: Dict[str, Any], positive, negative, repeats: int) -> Dict[str, Any]:
+    screen, _ = positive
+    locator = make_locator(screen, options)
+    locator.locate_any(NAMES)  # warm-up: coarse-scale self-tests, thread pool, ROI memory
+    per_template = {name: timings(lambda: locator.locate(name), repeats) for name in NAMES}
+    poll_hit = timings(lambda: locator.locate_any(NAMES, best=True), repeats)
+    memory = allocated_per_poll(locator)
+    locator.close()
+
+    locator = make_locator(negative, options)
+    locator.locate_any(NAMES)
+    poll_miss = timings(lambda: locator.locate_any(NAMES), repeats)
+    locator.close()
+    return {
+        "locate": per_template,
+        "poll_all_found": poll_hit,
+        "poll_none_found": poll_miss,
+        "polls_per_second": 1000 / poll_miss["median_ms"],
+        "allocated_bytes_per_poll": memory,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def run(resolutions: List[str], strategies: List[str], repeats: int, seeds: int,
+        negatives: Optional[int] = None) -> Dict[str, Any]:
+    """Benchmark every strategy on ``seeds`` positive and ``negatives`` (default ``seeds``) negative screens."""
+    templates = registry()
+    negatives = seeds if negatives is None else negatives
+    report: Dict[str, Any] = {"environment": environment(), "repeats": repeats, "seeds": seeds,
+                              "negatives": negatives, "thresholds": THRESHOLDS, "results": {}}
+    for label in resolutions:
+        width, height = RESOLUTIONS[label]
+        positive_screens = [make_screen(width, height, templates, NAMES, seed=seed) for seed in range(seeds)]
+        negative_screens = [make_background(width, height, seed=100 + seed) for seed in range(negatives)]
+        for name in strategies:
+            options = STRATEGIES[name]
+            print(f"{label} {name} ...", file=sys.stderr, flush=True)
+            result = run_strategy(options, positive_screens[0], negative_screens[0], repeats)
+            if name not in SAME_ACCURACY_AS:
+                result["accuracy"] = accuracy(options, positive_screens, negative_screens)
+            report["results"].setdefault(label, {})[name] = result
+        for name, same in SAME_ACCURACY_AS.items():
+            results = report["results"][label]
+            if name in results and same in results:
+                results[name]["accuracy"] = results[same]["accuracy"]
+    return report
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Latency, recall, precision and false-positive regressions of ``new`` relative to ``old``.
+
+    False positives are compared as counts, so both runs should use the
+    same number of negative screens.
+    """
+    problems = []
+    for label, strategies in new["results"].items():
+        for name, result in strategies.items():
+            before = old.get("results", {}).get(label, {}).get(name)
+            if before is None:
+                continue
+            for key in ("poll_all_found", "poll_none_found"):
+                was, now = before[key]["median_ms"], result[key]["median_ms"]
+                if now > was * (1 + LATENCY_REGRESSION):
+                    problems.append(f"{label} {name} {key}: {was:.1f} -> {now:.1f} ms")
+            for threshold, scores in result.get("accuracy", {}).items():
+                previous = before.get("accuracy", {}).get(threshold, {})
+                for key in ("recall", "precision"):
+                    was = previous.get(key)
+                    if was is not None and scores[key] < was - ACCURACY_REGRESSION:
+                        problems.append(f"{label} {name} {key}@{threshold}: {was:.3f} -> {scores[key]:.3f}")
+                was = previous.get("false_positives")
+                if was is not None and scores["false_positives"] > was:
+                    problems.append(f"{label} {name} false_positives@{threshold}: {was} -> "
+                                    f"{scores['false_positives']}")
+    return problems
+
+
+def print_table(report: Dict[str, Any]) -> None:
+    print(f"{'screen':>6} {'strategy':<20} {'hit ms':>8} {'miss ms':>8} {'polls/s':>8} {'alloc KB':>9} "
+          + " ".join(f"{'R@' + str(t):>7}" for t in THRESHOLDS) + f" {'FP@0.7':>6} {'FP@0.8':>6}")
+    for label, strategies in report["results"].items():
+        for name, result in strategies.items():
+            accuracy = result.get("accuracy", {})
+            recalls = " ".join(f"{accuracy[str(t)]['recall']:7.2f}" for t in THRESHOLDS) if accuracy else ""
+            false_positives = " ".join(f"{accuracy[t]['false_positives']:>6}" for t in ("0.7", "0.8")) \
+                if accuracy else ""
+            print(f"{label:>6} {name:<20} {result['poll_all_found']['median_ms']:8.1f} "
+                  f"{result['poll_none_found']['median_ms']:8.1f} {result['polls_per_second']:8.1f} "
+                  f"{result['allocated_bytes_per_poll'] / 1024:9.0f} {recalls} {false_positives}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the locate/match pipeline")
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--repeats", type=int, default=10, help="timed runs per measurement")
+    parser.add_argument("--seeds", type=int, default=3, help="positive and negative screens per resolution")
+    parser.add_argument("--negatives", type=int,
+                        help="negative screens per resolution for precision (default: --seeds)")
+    parser.add_argument("--quick", action="store_true",
+                        help="1080p only, 3 repeats, 1 positive and 4 negative screens")
+    parser.add_argument("--output", metavar="PATH",
+                        help="results file (default: bench/results/locate-<date>.json)")
+    parser.add_argument("--compare", metavar="OLD", help="report regressions against an earlier results file")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.resolutions, args.repeats, args.seeds = ["1080p"], 3, 1
+        args.negatives = args.negatives or 4
+
+    report = run(args.resolutions, args.strategies, args.repeats, args.seeds, args.negatives)
+    output = args.output or os.path.join("bench", "results", time.strftime("locate-%Y%m%d-%H%M%S.json"))
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_table(report)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(json.load(f), report)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
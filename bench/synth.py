@@ -0,0 +1,61 @@
+"""Synthetic desktop screenshots with the repo's templates pasted at known positions."""
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from capture import Box
+from templates import TemplateRegistry
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4K": (3840, 2160),
+}
+
+
+def make_background(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """A busy, UI-like BGR background: gradient, panels and text."""
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(40, 200, width, dtype=np.float32)
+    screen = np.empty((height, width, 3), dtype=np.uint8)
+    screen[:] = np.stack([ramp, ramp[::-1], np.full_like(ramp, 120)], axis=-1).astype(np.uint8)
+    for _ in range(width * height // 40000):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(20, 400)), int(rng.integers(10, 200))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(screen, (x, y), (x + w, y + h), color, -1)
+    for _ in range(width * height // 20000):
+        x, y = int(rng.integers(0, width)), int(rng.integers(10, height))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.putText(screen, "lorem ipsum %d" % rng.integers(0, 1000), (x, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    return screen
+
+
+def make_screen(width: int, height: int, templates: TemplateRegistry, names: Sequence[str],
+                seed: int = 0, background: Optional[np.ndarray] = None
+                ) -> Tuple[np.ndarray, Dict[str, Box]]:
+    """Paste each named template at a random, non-overlapping spot.
+
+    Returns the screen and the box every template was pasted at.
+    """
+    rng = np.random.default_rng(seed + 1)
+    screen = make_background(width, height, seed) if background is None else background.copy()
+    placed: Dict[str, Box] = {}
+    for name in names:
+        template = templates.get(name)
+        for _ in range(1000):
+            x = int(rng.integers(0, width - template.width))
+            y = int(rng.integers(0, height - template.height))
+            box = Box(x, y, template.width, template.height)
+            if not any(_overlaps(box, other) for other in placed.values()):
+                break
+        screen[y:y + template.height, x:x + template.width] = template.color
+        placed[name] = box
+    return screen, placed
+
+
+def _overlaps(a: Box, b: Box) -> bool:
+    return (a.left < b.left + b.width and b.left < a.left + a.width
+            and a.top < b.top + b.height and b.top < a.top + a.height)
@@ -0,0 +1,189 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+class Box(NamedTuple):
+    """Screen rectangle, unpacks like pyautogui's Box: (left, top, width, height)."""
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+class CaptureBackend:
+    """Source of BGR screen frames for the locator.
+
+    Frames may share memory with the backend and are only valid until the
+    next call to ``grab``; copy them if they need to outlive the poll.
+    Frames and regions are in frame coordinates; ``origin`` is where the
+    frame's top-left pixel is on the desktop, for turning them into click
+    positions. Regions are clipped to the frame; one entirely outside it
+    grabs the whole frame.
+    """
+
+    name = "base"
+    origin: Tuple[int, int] = (0, 0)
+
+    def grab(self, region: Optional[Box] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def clip(region: Box, width: int, height: int) -> Optional[Box]:
+    """``region`` intersected with a ``width`` x ``height`` frame, or None if they don't overlap."""
+    left, top = max(region.left, 0), max(region.top, 0)
+    right, bottom = min(region.left + region.width, width), min(region.top + region.height, height)
+    if right <= left or bottom <= top:
+        return None
+    return Box(left, top, right - left, bottom - top)
+
+
+def crop(frame: np.ndarray, region: Optional[Box] = None) -> np.ndarray:
+    """The part of a full-screen frame inside ``region`` (a view, not a copy).
+
+    A region entirely outside the frame counts as no region.
+    """
+    if region is not None:
+        region = clip(region, frame.shape[1], frame.shape[0])
+    if region is None:
+        return frame
+    return frame[region.top:region.top + region.height, region.left:region.left + region.width]
+
+
+class PyAutoGUICapture(CaptureBackend):
+    """Screenshots through pyautogui/pyscreeze, converted from PIL to BGR."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def grab(self, region: Optional[Box] = None) -> np.ndarray:
+        if region is not None:
+            region = clip(region, *self._pyautogui.size())
+        screenshot = self._pyautogui.screenshot(region=tuple(region) if region else None)
+        return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR)
+
+
+class MSSCapture(CaptureBackend):
+    """Persistent mss grabber that converts into reused BGR buffers.
+
+    The mss handle keeps its display connection / device context open
+    between grabs, and the BGRA pixels are converted straight into a
+    per-size NumPy buffer that is handed to OpenCV, with no PIL image in
+    between. mss handles are tied to the thread that created them, so a new
+    one is opened if the automation thread changes. Frames cover
+    ``monitor`` only, so regions are offset by its position on the desktop.
+    """
+
+    name = "mss"
+
+    def __init__(self, monitor: int = 1):
+        import mss
+        self._mss = mss
+        self.monitor = monitor
+        self._sct = None
+        self._owner: Optional[int] = None
+        self._buffers: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def _handle(self):
+        thread_id = threading.get_ident()
+        if self._sct is None or self._owner != thread_id:
+            self.close()
+            self._sct = self._mss.mss()
+            self._owner = thread_id
+        return self._sct
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        monitor = self._handle().monitors[self.monitor]
+        return monitor["left"], monitor["top"]
+
+    def grab(self, region: Optional[Box] = None) -> np.ndarray:
+        sct = self._handle()
+        monitor = sct.monitors[self.monitor]
+        if region is not None:
+            region = clip(region, monitor["width"], monitor["height"])
+        if region is None:
+            area = monitor
+        else:
+            area = {"left": monitor["left"] + region.left, "top": monitor["top"] + region.top,
+                    "width": region.width, "height": region.height}
+        shot = sct.grab(area)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        key = (shot.height, shot.width)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = np.empty((shot.height, shot.width, 3), dtype=np.uint8)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=buffer)
+
+    def close(self) -> None:
+        if self._sct is not None:
+            try:
+                self._sct.close()
+            except Exception:
+                pass
+            self._sct = None
+
+
+class FileCapture(CaptureBackend):
+    """Offline backend that serves frames from image files or arrays.
+
+    Every ``grab`` returns the next frame; the last one is repeated once
+    the sequence runs out (or it starts over when ``loop`` is set). Lets the
+    locator and the automation flow run headless.
+    """
+
+    name = "file"
+
+    def __init__(self, frames: Sequence[Union[str, np.ndarray]], loop: bool = False):
+        if not frames:
+            raise ValueError("FileCapture needs at least one frame")
+        self.frames: List[Union[str, np.ndarray]] = list(frames)
+        self.loop = loop
+        self.index = 0
+        self._decoded: Dict[int, np.ndarray] = {}
+
+    def _frame(self, index: int) -> np.ndarray:
+        frame = self.frames[index]
+        if isinstance(frame, np.ndarray):
+            return frame
+        if index not in self._decoded:
+            image = cv2.imread(frame, cv2.IMREAD_COLOR)
+            if image is None:
+                raise FileNotFoundError(f"Could not decode frame: {frame}")
+            self._decoded[index] = image
+        return self._decoded[index]
+
+    def grab(self, region: Optional[Box] = None) -> np.ndarray:
+        frame = self._frame(self.index)
+        if self.index + 1 < len(self.frames):
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+        return crop(frame, region)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUICapture,
+    "mss": MSSCapture,
+}
+
+
+def create_backend(name: str = "auto") -> CaptureBackend:
+    """Build a live capture backend by name; "auto" prefers mss when it is installed."""
+    if name == "auto":
+        try:
+            return MSSCapture()
+        except ImportError:
+            return PyAutoGUICapture()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown capture backend: {name}") from None
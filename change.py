@@ -0,0 +1,134 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from locator import Box, Locator
+
+
+class FrameDiffGate:
+    """Decides whether a poll is worth a full template match.
+
+    Each check grabs a small, downsampled grayscale copy of one screen region
+    and compares it with the previous one. Full matching only needs to run
+    when the mean pixel difference crosses ``threshold`` or when ``heartbeat``
+    seconds have passed since the last match, so a static screen costs one
+    tiny capture per poll.
+
+    With ``fraction``, a sample also differs when at least that share of its
+    pixels moved by ``pixel_threshold`` grey levels or more, which catches a
+    button-sized change that barely moves the mean of a large region.
+
+    ``moved`` tells whether the last check passed because the region
+    changed rather than because the heartbeat was due.
+    """
+
+    def __init__(self, locator: Locator, region: Optional[Box] = None, scale: float = 0.25,
+                 threshold: float = 2.0, heartbeat: float = 10.0, fraction: Optional[float] = None,
+                 pixel_threshold: int = 25, clock: Callable[[], float] = time.monotonic):
+        self.locator = locator
+        self.region = region
+        self.scale = scale
+        self.threshold = threshold
+        self.fraction = fraction
+        self.pixel_threshold = pixel_threshold
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.previous: Optional[np.ndarray] = None
+        self.last_pass = float("-inf")
+        self.checks = 0
+        self.skipped = 0
+        self.moved = False
+
+    def sample(self) -> np.ndarray:
+        """Capture the watched region, downsampled to grayscale."""
+        frame = self.locator.capture(self.region)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def differs(self, a: np.ndarray, b: np.ndarray) -> bool:
+        """True if two samples differ by at least ``threshold`` on average, or in ``fraction`` of their pixels."""
+        if a.shape != b.shape:
+            return True
+        diff = cv2.absdiff(a, b)
+        if float(diff.mean()) >= self.threshold:
+            return True
+        return self.fraction is not None and \
+            cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold - 1, 255, cv2.THRESH_BINARY)[1]) \
+            >= self.fraction * diff.size
+
+    def changed(self) -> bool:
+        """True if the region changed since the last check or the heartbeat is due."""
+        self.checks += 1
+        current = self.sample()
+        previous, self.previous = self.previous, current
+        now = self.clock()
+
+        self.moved = previous is None or self.differs(previous, current)
+        if self.moved or now - self.last_pass >= self.heartbeat:
+            self.last_pass = now
+            return True
+
+        self.skipped += 1
+        return False
+
+
+@dataclass
+class SettleResult:
+    """Outcome of wait_for_settle."""
+    changed: bool
+    settled: bool
+    elapsed: float
+
+    def describe(self) -> str:
+        if self.settled:
+            return f"screen settled after {self.elapsed:.2f}s"
+        if self.changed:
+            return f"screen still changing after {self.elapsed:.2f}s"
+        return f"no change within {self.elapsed:.2f}s"
+
+
+def wait_for_settle(locator: Locator, region: Optional[Box] = None, max_wait: float = 5.0,
+                    stable_for: float = 0.3, interval: float = 0.1, threshold: float = 2.0,
+                    fraction: float = 0.002, scale: float = 0.25, keep_going: Callable[[], bool] = lambda: True,
+                    clock: Callable[[], float] = time.monotonic,
+                    sleep: Callable[[float], None] = time.sleep) -> SettleResult:
+    """Wait for the UI to react to an input action and then stop moving.
+
+    Samples ``region`` (the whole screen by default; pass a box around the
+    clicked button where there is one) every ``interval`` seconds. A sample
+    counts as changed when its mean moves by ``threshold`` or ``fraction``
+    of its pixels change (see FrameDiffGate). Returns once the region has
+    changed and then stayed still for ``stable_for`` seconds, or after
+    ``max_wait`` seconds either way. Replaces fixed sleeps after clicks and
+    key presses.
+    """
+    gate = FrameDiffGate(locator, region=region, scale=scale, threshold=threshold, fraction=fraction,
+                         clock=clock)
+    start = clock()
+    reference = gate.sample()
+    previous = reference
+    changed = False
+    stable_since = None
+
+    while keep_going():
+        elapsed = clock() - start
+        if elapsed >= max_wait:
+            break
+        sleep(min(interval, max_wait - elapsed))
+        current = gate.sample()
+        now = clock()
+        if not changed:
+            changed = gate.differs(reference, current)
+            stable_since = now if changed else None
+        elif gate.differs(previous, current):
+            stable_since = now
+        elif now - stable_since >= stable_for:
+            return SettleResult(changed=True, settled=True, elapsed=now - start)
+        previous = current
+
+    return SettleResult(changed=changed, settled=False, elapsed=clock() - start)
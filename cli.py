@@ -0,0 +1,139 @@
+"""Headless runner: the same automation as the GUI, driven from the command line.
+
+    python cli.py flows/video.json --cycles 10 --confidence 0.75 --timeout wait_end=7200 --poll fast
+
+Does not import tkinter, so it starts faster and uses less memory than
+main.py and can run on machines without a display server toolkit.
+"""
+import argparse
+import signal
+import sys
+from typing import Any, Callable, List, Optional
+
+from capture import BACKENDS, create_backend
+from engine import DEFAULT_FLOW, Engine
+from events import EventLog
+from exporter import add_arguments, serve
+from flow import Flow
+from inputs import BACKENDS as INPUT_BACKENDS, create_input
+from polling import PRESETS, strategy_from_config
+from replay import Recorder, RecordingCapture, RecordingInput
+from templates import TemplateRegistry
+
+
+def apply_overrides(flow: Flow, field: str, specs: List[str], convert: Callable[[str], Any]) -> None:
+    """Set ``field`` on flow states from "value" (every state) or "state=value" specs."""
+    for spec in specs:
+        name, sep, value = spec.rpartition("=")
+        if not sep:
+            targets = list(flow.states.values())
+        elif name in flow.states:
+            targets = [flow.states[name]]
+        else:
+            raise ValueError(f"Unknown state in --{field} {spec}")
+        converted = convert(value)
+        for state in targets:
+            setattr(state, field, converted)
+
+
+def poll_preset(value: str) -> str:
+    strategy_from_config(value)
+    return value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the video automation without a GUI")
+    parser.add_argument("flow", nargs="?", default=DEFAULT_FLOW, help="flow definition (JSON)")
+    parser.add_argument("--templates", default="", metavar="DIR",
+                        help="directory holding the template images (default: current directory)")
+    parser.add_argument("--confidence", action="append", default=[], metavar="[STATE=]VALUE",
+                        help="match confidence for every state, or for one state; repeatable")
+    parser.add_argument("--timeout", action="append", default=[], metavar="[STATE=]SECONDS",
+                        help="wait timeout for every state, or for one state; repeatable")
+    parser.add_argument("--poll", action="append", default=[], metavar="[STATE=]PRESET",
+                        help=f"polling preset ({', '.join(PRESETS)}) for every state, or for one state")
+    parser.add_argument("--cycles", type=int, help="stop after this many cycles")
+    parser.add_argument("--start-delay", type=float, default=5.0,
+                        help="seconds to wait before the first cycle, to bring the browser to the front")
+    parser.add_argument("--capture", choices=["auto", *BACKENDS], default="auto", help="screen capture backend")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="template matching threads (default: one per core, up to 4)")
+    parser.add_argument("--input", choices=["auto", *INPUT_BACKENDS], default="auto",
+                        help="mouse/keyboard backend (stub only logs the actions)")
+    parser.add_argument("--events", default=None, metavar="PATH", help="event log file (JSON lines)")
+    add_arguments(parser)
+    parser.add_argument("--stats", metavar="PATH", help="write a metrics snapshot here on exit")
+    parser.add_argument("--record", metavar="DIR",
+                        help="record the screen and inputs of this run for replay.py")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    events = EventLog(args.events) if args.events else EventLog()
+    backend = create_backend(args.capture)
+    input_backend = create_input(args.input)
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record)
+        origin = list(backend.origin)
+        recorder.write_session(flow=args.flow, templates=args.templates, capture=backend.name,
+                               origin=origin, start_delay=args.start_delay)
+        backend = RecordingCapture(backend, recorder)
+        input_backend = RecordingInput(input_backend, recorder)
+    engine = Engine(args.flow, templates=TemplateRegistry(args.templates), events=events.start(),
+                    backend=backend, input_backend=input_backend, workers=args.workers,
+                    start_delay=args.start_delay)
+    if not engine.load_flow():
+        engine.close()
+        if recorder is not None:
+            recorder.close()
+        return 2
+    try:
+        apply_overrides(engine.flow, "confidence", args.confidence, float)
+        apply_overrides(engine.flow, "timeout", args.timeout, float)
+        apply_overrides(engine.flow, "poll", args.poll, poll_preset)
+    except ValueError as e:
+        engine.log(str(e), "ERROR")
+        engine.close()
+        if recorder is not None:
+            recorder.close()
+        return 2
+    engine.load_templates()
+    if recorder is not None:
+        recorder.write_snapshot(engine.flow, engine.locator.memory)
+
+    server = None
+    if args.metrics_port is not None:
+        server = serve(engine.metrics, args.metrics_host, args.metrics_port, engine.log)
+
+    # SIGTERM stops the loop the same way Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda signum, frame: engine.stop())
+    engine.log("Press Ctrl+C to stop the loop at any time", "INFO")
+    try:
+        engine.run(args.cycles)
+    except KeyboardInterrupt:
+        engine.stop()
+        engine.log(f"Automation stopped by user after {engine.cycle_count} cycles "
+                   f"({engine.none_video_count} none videos)", "INFO")
+        engine.events.emit("stopped", cycles=engine.cycle_count, none_videos=engine.none_video_count)
+    finally:
+        engine.save()
+        if args.stats:
+            engine.log(f"Stats exported to {engine.metrics.export(args.stats)}", "INFO")
+        if server is not None:
+            server.close()
+        engine.close()
+        if recorder is not None:
+            recorder.write_session(flow=args.flow, templates=args.templates, capture=backend.name,
+                                   origin=origin, start_delay=args.start_delay,
+                                   cycles=engine.cycle_count)
+            recorder.close()
+            engine.log(f"Recorded {recorder.grabs} grabs ({recorder.frames_stored} distinct frames) "
+                       f"to {args.record}", "INFO")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from capture import Box, CaptureBackend
+from change import FrameDiffGate, wait_for_settle
+from events import EventLog
+from flow import DEFAULT_FLOW, Flow, FlowRunner, State
+from inputs import Input, InputBackend
+from locator import DPI_SCALES, Locator, Match, RegionMemory
+from metrics import Metrics
+from polling import Fixed, PollScheduler, PollStrategy, strategy_from_config
+from progress import PlaybackEnd, ProgressEstimator
+from templates import PROFILES, TemplateRegistry
+
+Log = Callable[[str, str], None]
+
+
+def print_log(message: str, level: str = "INFO") -> None:
+    print(f"[{time.strftime('%H:%M:%S')}] [{level}] {message}", flush=True)
+
+
+class Engine:
+    """The automation core shared by the Tk GUI and the headless CLI.
+
+    Owns the templates, locator, flow, metrics and event log, and runs video
+    cycles until ``stop`` is called (from any thread) or ``max_cycles`` is
+    reached. Front ends plug in through ``log`` (message, level) and
+    ``on_update``, which is called whenever the cycle or none-video
+    counters or the predicted end of playback (``playback_end``, on
+    ``clock``) change. The first cycle starts ``start_delay`` seconds after
+    ``run``, giving the user time to bring the browser to the front.
+
+    Input goes through ``inputs`` (see inputs.py), on ``input_backend`` or
+    the best live one, and all waiting uses ``clock``/``sleep``, so a replay
+    can run the engine headless on a virtual clock with a StubInput (see
+    replay.py).
+    """
+
+    def __init__(self, flow_path: str = DEFAULT_FLOW, log: Log = print_log,
+                 on_update: Optional[Callable[[], None]] = None,
+                 templates: Optional[TemplateRegistry] = None,
+                 events: Optional[EventLog] = None, metrics: Optional[Metrics] = None,
+                 backend: Optional[CaptureBackend] = None, workers: Optional[int] = None,
+                 memory: Optional[RegionMemory] = None,
+                 input_backend: Optional[InputBackend] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 start_delay: float = 5.0, retry_settle: float = 5.0):
+        self.clock = clock
+        self.sleep = sleep
+        self.flow_path = flow_path
+        self.log = log
+        self.on_update = on_update
+        self.flow: Optional[Flow] = None
+        self.events = events or EventLog().start()
+        self.metrics = metrics or Metrics()
+        self.inputs = Input(input_backend, metrics=self.metrics, sleep=sleep)
+        self.templates = templates or TemplateRegistry()
+        self.locator = Locator(self.templates, memory or RegionMemory(), scales=DPI_SCALES,
+                               workers=workers or min(4, os.cpu_count() or 1),
+                               backend=backend, metrics=self.metrics)
+        self.start_delay = start_delay
+        self.retry_settle = retry_settle
+
+        self.is_running = False
+        self.cycle_count = 0
+        self.none_video_count = 0
+        self.playback_end: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def load_flow(self) -> bool:
+        """Load the automation cycle definition."""
+        try:
+            self.flow = Flow.load(self.flow_path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.log(f"Could not load flow {self.flow_path}: {e}", "ERROR")
+            return False
+        unknown = sorted(set(self.flow.profiles.values()) - set(PROFILES))
+        if unknown:
+            self.log(f"Flow {self.flow_path} uses unknown matching profiles: {', '.join(unknown)}", "ERROR")
+            self.flow = None
+            return False
+        self.templates.names = tuple(dict.fromkeys(
+            [name for state in self.flow.states.values() for name in state.wait_for]
+            + list(self.flow.interrupts)))
+        self.templates.profiles.update(self.flow.profiles)
+        self.log(f"Loaded flow '{self.flow.name}' from {self.flow_path}", "INFO")
+        return True
+
+    def load_templates(self) -> List[str]:
+        """Decode all template images once so polls don't hit the disk.
+
+        Interrupts are optional: one whose template is missing is dropped
+        from the flow rather than failing every wait.
+        """
+        missing = self.templates.preload()
+        for name in missing:
+            if self.flow is not None and self.flow.interrupts.pop(name, None) is not None:
+                self.log(f"Interrupt template {name} could not be loaded; not checking for it", "WARNING")
+            else:
+                self.log(f"Template {name} could not be loaded", "WARNING")
+        self.log(f"Screen capture backend: {self.locator.backend.name}, input backend: {self.inputs.backend.name}", "INFO")
+        return missing
+
+    def _changed(self) -> None:
+        if self.on_update is not None:
+            self.on_update()
+
+    def wait_for_image(self, image_path: str, confidence: float = 0.8,
+                       timeout: int = 30, check_interval: float = 0.5,
+                       gate: Optional[FrameDiffGate] = None,
+                       strategy: Optional[PollStrategy] = None) -> Optional[Tuple[int, int, int, int]]:
+        """Wait for an image to appear on screen."""
+        match = self.wait_for_any([image_path], confidence, timeout, check_interval, gate, strategy)
+        return match.box if match else None
+
+    def wait_for_any(self, image_paths: List[str], confidence: float = 0.8,
+                     timeout: int = 30, check_interval: float = 0.5,
+                     gate: Optional[FrameDiffGate] = None,
+                     strategy: Optional[PollStrategy] = None,
+                     interrupts: Optional[Dict[str, float]] = None) -> Optional[Match]:
+        """Wait for any of several images, matching all of them against one screenshot per poll.
+
+        With a gate, polls where the watched region hasn't changed skip the match,
+        and polls where it has changed search the interrupts in full.
+        The strategy sets the spacing of polls; it defaults to a fixed check_interval.
+        ``interrupts`` (name -> confidence) are checked against the same
+        screenshot and end the wait as soon as one of them shows up.
+        """
+        def poll() -> Optional[Match]:
+            if gate is not None and not gate.changed():
+                return None
+            # Skipped polls miss whatever appeared meanwhile, so a change gets a full interrupt search
+            return self.locator.locate_any(image_paths, confidence=confidence, interrupts=interrupts,
+                                           full_interrupts=gate is not None and gate.moved)
+
+        scheduler = PollScheduler(strategy or Fixed(check_interval), clock=self.clock, sleep=self.sleep)
+        match = scheduler.wait(poll, timeout, keep_going=lambda: self.is_running)
+        stats = scheduler.stats
+        self.metrics.observe("wait_polls", stats.polls)
+        self.metrics.observe("wait_seconds", stats.elapsed)
+        interrupted = match is not None and match.name not in image_paths
+        if interrupted:
+            self.log(f"Wait for {' / '.join(image_paths)} interrupted: {match.name} is on screen", "WARNING")
+        elif match:
+            self.metrics.observe("detect_latency_seconds", stats.latency)
+        elif self.is_running:
+            self.metrics.inc("wait_timeouts", target=" / ".join(image_paths))
+        target = match.name if match else " / ".join(image_paths)
+        self.log(f"Waited for {target}: {stats.describe()}", "INFO")
+        self.events.emit(
+            "wait", cycle=self.cycle_count, targets=list(image_paths), confidence=confidence,
+            found=match.name if match else None, score=round(match.score, 4) if match else None,
+            box=list(match.box) if match else None, polls=stats.polls, elapsed=round(stats.elapsed, 3),
+            latency=round(stats.latency, 3) if match else None,
+            timed_out=match is None and self.is_running, interrupted=interrupted,
+            gate_skipped=gate.skipped if gate is not None else None,
+        )
+        return match
+
+    def click_center(self, location: Tuple[int, int, int, int]) -> None:
+        """Click the center of a located image."""
+        x, y, w, h = location
+        left, top = self.locator.backend.origin
+        self.inputs.click(left + x + w / 2, top + y + h / 2)
+
+    def wait_for_state(self, state: State) -> Optional[Match]:
+        """Wait for whatever a flow state is looking for."""
+        gate = None
+        if state.gate:
+            # Only run the full match when the area where the target shows up has changed
+            gate = FrameDiffGate(self.locator, region=self.locator.search_region(state.wait_for[0]),
+                                 clock=self.clock)
+        strategy = strategy_from_config(state.poll)
+        interrupts = self.flow.interrupts_for(state) if self.flow is not None else {}
+        if not state.progress:
+            return self.wait_for_any(state.wait_for, state.confidence, state.timeout,
+                                     gate=gate, strategy=strategy, interrupts=interrupts)
+        try:
+            match = self.wait_for_any(state.wait_for, state.confidence, state.timeout, gate=gate,
+                                      strategy=self.playback_strategy(state, strategy), interrupts=interrupts)
+            if match is not None and match.name in state.wait_for and self.playback_end is not None:
+                self.metrics.observe("playback_eta_error_seconds", abs(self.clock() - self.playback_end))
+            return match
+        finally:
+            self.playback_end = None
+            self._changed()
+
+    def playback_strategy(self, state: State, fallback: PollStrategy) -> PlaybackEnd:
+        """Poll around the end of playback predicted from the seek bar, or like ``fallback``."""
+        options = dict(state.progress) if isinstance(state.progress, dict) else {}
+        region = options.pop("region", None)
+        estimator = ProgressEstimator(self.locator, clock=self.clock, region=Box(*region) if region else None)
+
+        def on_estimate(remaining: Optional[float]) -> None:
+            if remaining is None:
+                if self.playback_end is not None:
+                    self.playback_end = None
+                    self._changed()
+                return
+            self.playback_end = self.clock() + remaining
+            self._changed()
+            self.events.emit("progress", cycle=self.cycle_count, state=state.name,
+                             fraction=round(estimator.samples[-1][1], 4), remaining=round(remaining, 1),
+                             bar=list(estimator.bar))
+
+        return PlaybackEnd(estimator, fallback, on_estimate=on_estimate, **options)
+
+    def wait_for_settle(self, max_wait: float, near: Optional[Box] = None) -> None:
+        """Wait for the screen to react to the last input and stop changing, up to max_wait seconds.
+
+        With ``near`` (e.g. the button just clicked), only a padded box around it is watched.
+        """
+        region = self.locator.around(near) if near is not None else None
+        result = wait_for_settle(self.locator, region=region, max_wait=max_wait,
+                                 keep_going=lambda: self.is_running, clock=self.clock, sleep=self.sleep)
+        self.metrics.observe("settle_seconds", result.elapsed)
+        self.log(result.describe().capitalize(), "INFO")
+        self.events.emit("settle", cycle=self.cycle_count, max_wait=max_wait,
+                         region=list(region) if region else None, changed=result.changed,
+                         settled=result.settled, elapsed=round(result.elapsed, 3))
+
+    def pause(self, max_wait: float) -> None:
+        """wait_for_settle between cycles; sleeps ``max_wait`` instead when the screen can't be captured.
+
+        Capture fails while the workstation is locked or a remote session is
+        disconnected, and that must not end the loop.
+        """
+        try:
+            self.wait_for_settle(max_wait)
+        except Exception as e:
+            self.log(f"Could not watch the screen settle ({e}); sleeping {max_wait:g} seconds", "WARNING")
+            self.sleep(max_wait)
+
+    def on_flow_event(self, event: str) -> None:
+        """Update counters for events raised by the flow."""
+        if event == "none_video":
+            self.none_video_count += 1
+            self._changed()
+
+    def process_video(self) -> bool:
+        """Process one video cycle."""
+        if self.flow is None:
+            self.log("No flow loaded", "ERROR")
+            return False
+        runner = FlowRunner(
+            self.flow,
+            wait=self.wait_for_state,
+            click=lambda match: self.click_center(match.box),
+            press=self.inputs.press,
+            log=self.log,
+            on_event=self.on_flow_event,
+            settle=self.wait_for_settle,
+            events=self.events,
+            metrics=self.metrics,
+            clock=self.clock,
+        )
+        try:
+            success = runner.run()
+        except Exception as e:
+            self.log(f"Error in video processing: {e}", "ERROR")
+            return False
+        if success:
+            self.log("Video cycle completed successfully", "SUCCESS")
+        return success
+
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        """Run cycles on the calling thread until stopped or max_cycles is reached."""
+        self.is_running = True
+        self.cycle_count = 0
+        self.none_video_count = 0
+        self._changed()
+        # Time to switch to the browser; the screen would "settle" on the front end's own redraw
+        self.sleep(self.start_delay)
+
+        while self.is_running and (max_cycles is None or self.cycle_count < max_cycles):
+            self.cycle_count += 1
+            self._changed()
+
+            self.log("=" * 60, "INFO")
+            self.log(f"Starting cycle #{self.cycle_count}", "INFO")
+            self.log("=" * 60, "INFO")
+
+            self.events.emit("cycle_start", cycle=self.cycle_count, flow=self.flow.name if self.flow else None)
+            cycle_start = self.clock()
+            success = self.process_video()
+            cycle_time = self.clock() - cycle_start
+            self.metrics.observe("cycle_seconds", cycle_time)
+            self.metrics.inc("cycles", result="success" if success else "failure")
+            self._changed()
+            self.events.emit("cycle_end", cycle=self.cycle_count, success=success,
+                             duration=round(cycle_time, 3), none_videos=self.none_video_count)
+
+            if not success:
+                self.log(f"Cycle #{self.cycle_count} failed. Retrying within {self.retry_settle:g} seconds...",
+                         "WARNING")
+                self.pause(self.retry_settle)
+            else:
+                self.log(f"Cycle #{self.cycle_count} completed successfully", "SUCCESS")
+
+        self.is_running = False
+        self.log("Automation loop exited", "INFO")
+        self.events.emit("stopped", cycles=self.cycle_count, none_videos=self.none_video_count)
+
+    def start(self, max_cycles: Optional[int] = None) -> None:
+        """Run cycles on a daemon thread."""
+        self.is_running = True
+        self._thread = threading.Thread(target=self.run, args=(max_cycles,), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Ask the loop to stop; waits in progress return at their next poll."""
+        self.is_running = False
+
+    def save(self) -> None:
+        """Persist learned button regions and report how well they worked."""
+        self.locator.memory.save()
+        self.log(f"Learned button regions hit {self.locator.memory.hit_ratio():.0%} of the time "
+                 f"(UI scale {self.locator.scale:g})", "INFO")
+
+    def close(self) -> None:
+        self.stop()
+        self.locator.close()
+        self.inputs.close()
+        self.events.close()
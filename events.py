@@ -0,0 +1,118 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_STOP = object()
+
+
+class EventLog:
+    """Structured JSON-lines event log written by a background thread.
+
+    ``emit`` only stamps the event and puts it on a queue, so calling it from
+    the automation loop costs about a microsecond. The writer thread collects
+    whatever is queued, writes it as one batch and flushes at most every
+    ``flush_interval`` seconds. The file is rotated (events.jsonl ->
+    events.jsonl.1 -> ...) when it grows past ``max_bytes`` or has been open
+    for ``rotate_every`` seconds.
+    """
+
+    def __init__(self, path: str = os.path.join("logs", "events.jsonl"), max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 10, rotate_every: Optional[float] = 24 * 3600,
+                 flush_interval: float = 1.0, max_batch: int = 5000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotate_every = rotate_every
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._file = None
+        self._opened_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "EventLog":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+            self._thread.start()
+        return self
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Queue one event; callable from any thread."""
+        fields["event"] = event
+        fields["ts"] = time.time()
+        self._queue.put(fields)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out everything queued so far and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _take(self) -> List[Any]:
+        """Block up to flush_interval for the first item, then grab what else is queued."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        try:
+            while len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            stop = any(item is _STOP for item in batch)
+            events = [item for item in batch if item is not _STOP]
+            if events:
+                self._write(events)
+            if stop:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, events: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+        try:
+            if self._should_rotate():
+                self._rotate()
+            if self._file is None:
+                self._open()
+            self._file.write(lines)
+            self._file.flush()
+        except OSError:
+            self.dropped += len(events)
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _should_rotate(self) -> bool:
+        if self._file is None:
+            return os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes
+        if self._file.tell() >= self.max_bytes:
+            return True
+        return self.rotate_every is not None and time.time() - self._opened_at >= self.rotate_every
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.1")
@@ -0,0 +1,131 @@
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from metrics import Metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_PORT = 9464
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str], **extra: str) -> str:
+    merged = dict(labels, **extra)
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in merged.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics: Metrics, prefix: str = "autorun_") -> str:
+    """All counters and histograms in the Prometheus text exposition format."""
+    counters, histograms = metrics.collect()
+    lines: List[str] = []
+    typed = set()
+
+    for name, labels, value in counters:
+        metric = f"{prefix}{name}_total"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_labels(labels)} {_number(value)}")
+
+    for name, labels, buckets, count, total in histograms:
+        metric = f"{prefix}{name}"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        for bound, observed in buckets:
+            lines.append(f"{metric}_bucket{_labels(labels, le=_number(float(bound)))} {observed}")
+        lines.append(f"{metric}_bucket{_labels(labels, le='+Inf')} {count}")
+        lines.append(f"{metric}_sum{_labels(labels)} {_number(float(total))}")
+        lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+    lines.append(f"# TYPE {prefix}uptime_seconds gauge")
+    lines.append(f"{prefix}uptime_seconds {_number(metrics.uptime())}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``render(metrics)`` on http://host:port/metrics from a daemon thread.
+
+    A scrape only copies the numbers under the metrics lock and formats them
+    on the server thread, so it never waits on the automation loop. Binds to
+    localhost by default; pass host="0.0.0.0" to let a fleet scraper in.
+    """
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        if self._server is not None:
+            return self
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = render(metrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        # Port 0 asks the OS for a free port
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+
+def add_arguments(parser: argparse.ArgumentParser, subject: str = "Prometheus metrics") -> None:
+    """The --metrics-port / --metrics-host options that go with ``serve``."""
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=DEFAULT_PORT,
+                        help=f"serve {subject} on this port (default {DEFAULT_PORT})")
+    parser.add_argument("--metrics-host", default="127.0.0.1",
+                        help="interface for the metrics endpoint (0.0.0.0 for all)")
+
+
+def serve(metrics: Metrics, host: str, port: int,
+          log: Callable[[str, str], None]) -> Optional[MetricsServer]:
+    """Start a MetricsServer, or log why not and return None (e.g. the port is taken)."""
+    try:
+        server = MetricsServer(metrics, host, port).start()
+    except OSError as e:
+        log(f"Could not serve metrics on {host}:{port}: {e}; running without them", "WARNING")
+        return None
+    log(f"Serving metrics at {server.url}", "INFO")
+    return server
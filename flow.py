@@ -0,0 +1,262 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from events import EventLog
+from metrics import Metrics
+from polling import strategy_from_config
+
+if TYPE_CHECKING:
+    # Only needed for annotations; keeps OpenCV out of the import
+    from locator import Box, Match
+
+DEFAULT_FLOW = os.path.join("flows", "video.json")
+
+ACTIONS = (None, "click", "press")
+RESULTS = (None, "success", "failure")
+
+
+@dataclass
+class Transition:
+    """What to do once a state's wait ends: act, log, then go on or finish.
+
+    ``settle`` is the longest time to wait for the screen to react to the
+    action and stop changing before moving on (0 moves on immediately).
+    """
+    next: Optional[str] = None
+    action: Optional[str] = None
+    key: Optional[str] = None
+    settle: float = 0.0
+    log: Optional[str] = None
+    level: str = "INFO"
+    result: Optional[str] = None
+    event: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Transition":
+        return cls(**data)
+
+
+@dataclass
+class State:
+    """One step of a flow: wait for any of ``wait_for``, then take a transition.
+
+    ``progress`` (true, or a dict of PlaybackEnd options plus an optional
+    fixed "region" [left, top, width, height]) schedules polls around the
+    end of playback predicted from the player's seek bar. ``interrupts``
+    false stops the flow's interrupts from cutting this state's wait short,
+    e.g. in the state that recovers from one.
+    """
+    name: str
+    wait_for: List[str]
+    confidence: float = 0.8
+    timeout: float = 30
+    poll: Any = "fixed"
+    gate: bool = False
+    progress: Any = False
+    interrupts: bool = True
+    log: Optional[str] = None
+    on_found: Transition = field(default_factory=Transition)
+    on_timeout: Transition = field(default_factory=lambda: Transition(result="failure"))
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "State":
+        data = dict(data)
+        on_found = Transition.from_dict(data.pop("on_found", {}))
+        on_timeout = Transition.from_dict(data.pop("on_timeout", {"result": "failure"}))
+        return cls(name=name, on_found=on_found, on_timeout=on_timeout, **data)
+
+
+@dataclass
+class Interrupt:
+    """A template that can show up during any wait (sign-in page, error dialog).
+
+    It is checked against the same frame as the state's own templates on
+    every poll; when found, ``on_found`` is taken instead of the state's
+    transition.
+    """
+    name: str
+    confidence: float = 0.8
+    on_found: Transition = field(default_factory=lambda: Transition(result="failure"))
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "Interrupt":
+        data = dict(data)
+        on_found = Transition.from_dict(data.pop("on_found", {"result": "failure"}))
+        return cls(name=name, on_found=on_found, **data)
+
+
+@dataclass
+class Flow:
+    """A declarative automation cycle, usually loaded from flows/*.json.
+
+    ``profiles`` optionally maps template names to a matching profile
+    (see templates.PROFILES). ``interrupts`` maps template names to what to
+    do when they cut a wait short.
+    """
+    name: str
+    start: str
+    states: Dict[str, State]
+    profiles: Dict[str, str] = field(default_factory=dict)
+    interrupts: Dict[str, Interrupt] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Flow":
+        states = {name: State.from_dict(name, spec) for name, spec in data["states"].items()}
+        interrupts = {name: Interrupt.from_dict(name, spec)
+                      for name, spec in data.get("interrupts", {}).items()}
+        flow = cls(name=data.get("name", "flow"), start=data["start"], states=states,
+                   profiles=dict(data.get("profiles", {})), interrupts=interrupts)
+        flow.validate()
+        return flow
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The flow as from_dict reads it, e.g. after command-line overrides."""
+        data = asdict(self)
+        for spec in (*data["states"].values(), *data["interrupts"].values()):
+            del spec["name"]
+        return data
+
+    def interrupts_for(self, state: State) -> Dict[str, float]:
+        """Interrupt templates (name -> confidence) to check while waiting in ``state``."""
+        if not state.interrupts:
+            return {}
+        return {name: interrupt.confidence for name, interrupt in self.interrupts.items()
+                if name not in state.wait_for}
+
+    @classmethod
+    def load(cls, path: str) -> "Flow":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def validate(self) -> None:
+        """Raise ValueError for dangling state names, unknown actions or bad polling options."""
+        if self.start not in self.states:
+            raise ValueError(f"Flow {self.name}: unknown start state {self.start}")
+        for state in self.states.values():
+            if not state.wait_for:
+                raise ValueError(f"Flow {self.name}: state {state.name} waits for nothing")
+            for transition in (state.on_found, state.on_timeout):
+                self._check(f"state {state.name}", transition)
+            self._check_polling(state)
+        for interrupt in self.interrupts.values():
+            self._check(f"interrupt {interrupt.name}", interrupt.on_found)
+
+    def _check_polling(self, state: State) -> None:
+        """Build the state's polling strategy once, so a bad option fails here and not when the state runs."""
+        # progress needs OpenCV, which importing a flow does not
+        from progress import PlaybackEnd
+        try:
+            strategy = strategy_from_config(state.poll)
+            if state.progress:
+                options = dict(state.progress) if isinstance(state.progress, dict) else {}
+                region = options.pop("region", None)
+                if region is not None and len(region) != 4:
+                    raise ValueError(f"progress region {region} is not [left, top, width, height]")
+                PlaybackEnd(None, strategy, **options)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Flow {self.name}: state {state.name}: {e}") from None
+
+    def _check(self, owner: str, transition: Transition) -> None:
+        if transition.action not in ACTIONS:
+            raise ValueError(f"Flow {self.name}: unknown action {transition.action}")
+        if transition.action == "press" and not transition.key:
+            raise ValueError(f"Flow {self.name}: {owner} presses no key")
+        if transition.result not in RESULTS:
+            raise ValueError(f"Flow {self.name}: unknown result {transition.result}")
+        if transition.next is None and transition.result is None:
+            raise ValueError(f"Flow {self.name}: {owner} has a dead-end transition")
+        if transition.next is not None and transition.next not in self.states:
+            raise ValueError(f"Flow {self.name}: unknown state {transition.next}")
+
+
+class FlowRunner:
+    """Drives one cycle of a Flow.
+
+    Each state's transition fires as soon as its wait returns, so there are
+    no fixed pauses between steps. The runner does no screen work itself:
+    ``wait`` blocks until one of the state's templates or of the flow's
+    interrupts is found (or returns None on timeout), ``click`` and ``press`` perform the actions, ``settle``
+    waits (up to the given seconds) for the screen to react to them, around
+    the clicked match's box after a click and anywhere after a key press, ``log``
+    receives (message, level) and ``on_event`` receives flow events such as
+    "none_video". With an EventLog, every step is recorded as a "step" event;
+    with Metrics, its duration goes into the "step_seconds" histogram and
+    flow events, interrupts and results are counted per state. Steps are
+    timed on ``clock``, so a replay's virtual clock shows in them too.
+    """
+
+    def __init__(self, flow: Flow, wait: Callable[[State], Optional["Match"]],
+                 click: Callable[["Match"], None], press: Callable[[str], None],
+                 log: Callable[[str, str], None],
+                 on_event: Optional[Callable[[str], None]] = None,
+                 settle: Optional[Callable[[float, Optional["Box"]], None]] = None,
+                 events: Optional[EventLog] = None, metrics: Optional[Metrics] = None,
+                 max_steps: int = 50, clock: Callable[[], float] = time.monotonic):
+        self.flow = flow
+        self.wait = wait
+        self.click = click
+        self.press = press
+        self.log = log
+        self.on_event = on_event
+        self.settle = settle
+        self.events = events
+        self.metrics = metrics
+        self.max_steps = max_steps
+        self.clock = clock
+
+    def run(self) -> bool:
+        """Run the flow from its start state. True if it ends in "success"."""
+        state = self.flow.states[self.flow.start]
+        for _ in range(self.max_steps):
+            if state.log:
+                self.log(state.log, "INFO")
+            step_start = self.clock()
+            match = self.wait(state)
+            waited = self.clock() - step_start
+            interrupt = self.flow.interrupts.get(match.name) if match and match.name not in state.wait_for else None
+            if interrupt is not None:
+                transition = interrupt.on_found
+                if self.metrics is not None:
+                    self.metrics.inc("flow_interrupts", template=interrupt.name, state=state.name)
+            else:
+                transition = state.on_found if match else state.on_timeout
+
+            if transition.log:
+                self.log(transition.log.format(match=match.name if match else ""), transition.level)
+            if transition.event:
+                if self.on_event:
+                    self.on_event(transition.event)
+                if self.metrics is not None:
+                    self.metrics.inc("flow_events", event=transition.event)
+            if transition.action == "click" and match:
+                self.click(match)
+            elif transition.action == "press":
+                self.press(transition.key)
+            if transition.settle and self.settle:
+                self.settle(transition.settle, match.box if transition.action == "click" and match else None)
+            if self.metrics is not None:
+                self.metrics.observe("step_seconds", self.clock() - step_start, state=state.name)
+                if match is None:
+                    self.metrics.inc("step_timeouts", state=state.name)
+            if self.events is not None:
+                self.events.emit(
+                    "step", flow=self.flow.name, state=state.name,
+                    found=match.name if match else None, score=round(match.score, 4) if match else None,
+                    interrupted=interrupt is not None,
+                    action=transition.action, next=transition.next, result=transition.result,
+                    wait=round(waited, 3), duration=round(self.clock() - step_start, 3),
+                )
+
+            if transition.result is not None:
+                if self.metrics is not None:
+                    self.metrics.inc("flow_results", result=transition.result, state=state.name)
+                return transition.result == "success"
+            state = self.flow.states[transition.next]
+
+        self.log(f"Flow {self.flow.name} did not finish within {self.max_steps} steps", "ERROR")
+        if self.metrics is not None:
+            self.metrics.inc("flow_results", result="max_steps", state=state.name)
+        return False
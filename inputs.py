@@ -0,0 +1,278 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import Metrics
+
+# pyautogui key names -> X keysym names, for the keys flows press
+X_KEYSYMS = {
+    "esc": "Escape", "escape": "Escape", "enter": "Return", "return": "Return", "space": "space",
+    "tab": "Tab", "backspace": "BackSpace", "delete": "Delete", "up": "Up", "down": "Down",
+    "left": "Left", "right": "Right", "home": "Home", "end": "End", "pageup": "Prior",
+    "pagedown": "Next",
+}
+
+
+class InputBackend:
+    """Sends mouse and keyboard input.
+
+    Actions may be buffered until ``flush``, so a batch of them goes out
+    together; single actions are flushed right away by Input.
+    """
+
+    name = "base"
+
+    def move(self, x: float, y: float) -> None:
+        raise NotImplementedError
+
+    def click(self, x: float, y: float) -> None:
+        raise NotImplementedError
+
+    def press(self, key: str) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class PyAutoGUIInput(InputBackend):
+    """Input through pyautogui, without its per-call PAUSE sleep.
+
+    pyautogui sleeps ``pyautogui.PAUSE`` (0.1 s by default) after every
+    call; ``_pause=False`` skips that for our calls only, leaving the global
+    setting alone. The fail-safe (mouse in a screen corner) still applies.
+    """
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def move(self, x: float, y: float) -> None:
+        self._pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, x: float, y: float) -> None:
+        self._pyautogui.click(x, y, _pause=False)
+
+    def press(self, key: str) -> None:
+        self._pyautogui.press(key, _pause=False)
+
+
+class XTestInput(InputBackend):
+    """Input through the XTest extension over one persistent X display connection.
+
+    Events are queued on the connection and sent together by ``flush``,
+    which skips pyautogui's per-call connection handling and sleeps. Needs
+    python-xlib; like MSSCapture, the connection is reopened if the
+    automation thread changes.
+    """
+
+    name = "xtest"
+
+    def __init__(self, display: Optional[str] = None):
+        from Xlib import X, XK, display as xdisplay
+        from Xlib.ext import xtest
+        self._X, self._XK, self._xdisplay, self._xtest = X, XK, xdisplay, xtest
+        self.display_name = display
+        self._display = None
+        self._owner: Optional[int] = None
+        self._keycodes: Dict[str, int] = {}
+        self._handle()
+
+    def _handle(self):
+        thread_id = threading.get_ident()
+        if self._display is None or self._owner != thread_id:
+            self.close()
+            self._display = self._xdisplay.Display(self.display_name)
+            if not self._display.has_extension("XTEST"):
+                raise RuntimeError("X server has no XTEST extension")
+            self._owner = thread_id
+            self._keycodes.clear()
+        return self._display
+
+    def _keycode(self, key: str) -> int:
+        if key not in self._keycodes:
+            keysym = self._XK.string_to_keysym(X_KEYSYMS.get(key.lower(), key))
+            keycode = self._handle().keysym_to_keycode(keysym) if keysym else 0
+            if not keycode:
+                raise ValueError(f"Unknown key: {key}")
+            self._keycodes[key] = keycode
+        return self._keycodes[key]
+
+    def move(self, x: float, y: float) -> None:
+        self._xtest.fake_input(self._handle(), self._X.MotionNotify, x=int(x), y=int(y))
+
+    def click(self, x: float, y: float) -> None:
+        display = self._handle()
+        self.move(x, y)
+        self._xtest.fake_input(display, self._X.ButtonPress, 1)
+        self._xtest.fake_input(display, self._X.ButtonRelease, 1)
+
+    def press(self, key: str) -> None:
+        display, keycode = self._handle(), self._keycode(key)
+        self._xtest.fake_input(display, self._X.KeyPress, keycode)
+        self._xtest.fake_input(display, self._X.KeyRelease, keycode)
+
+    def flush(self) -> None:
+        if self._display is not None:
+            self._display.sync()
+
+    def close(self) -> None:
+        if self._display is not None:
+            try:
+                self._display.close()
+            except Exception:
+                pass
+            self._display = None
+
+
+class StubInput(InputBackend):
+    """Records actions instead of sending them, for headless runs and replays.
+
+    ``actions`` holds {"t": clock time, "input": kind, "args": [...]} dicts.
+    """
+
+    name = "stub"
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.actions: List[Dict[str, Any]] = []
+
+    def _record(self, kind: str, *args: Any) -> None:
+        self.actions.append({"t": round(self.clock(), 4), "input": kind, "args": list(args)})
+
+    def move(self, x: float, y: float) -> None:
+        self._record("move", x, y)
+
+    def click(self, x: float, y: float) -> None:
+        self._record("click", x, y)
+
+    def press(self, key: str) -> None:
+        self._record("press", key)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIInput,
+    "xtest": XTestInput,
+    "stub": StubInput,
+}
+
+
+def create_input(name: str = "auto") -> InputBackend:
+    """Build an input backend by name; "auto" prefers XTest when python-xlib and an X display are there."""
+    if name == "auto":
+        try:
+            return XTestInput()
+        except Exception:
+            return PyAutoGUIInput()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown input backend: {name}") from None
+
+
+class Batch:
+    """A queued sequence of input actions, sent together by ``send``.
+
+        inputs.batch().move(x, y).click(x, y).pause(0.05).press("esc").send()
+    """
+
+    def __init__(self, inputs: "Input"):
+        self.inputs = inputs
+        self.actions: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def move(self, x: float, y: float) -> "Batch":
+        self.actions.append(("move", (x, y)))
+        return self
+
+    def click(self, x: float, y: float) -> "Batch":
+        self.actions.append(("click", (x, y)))
+        return self
+
+    def press(self, key: str) -> "Batch":
+        self.actions.append(("press", (key,)))
+        return self
+
+    def pause(self, seconds: float) -> "Batch":
+        """Wait between two actions (sends everything queued before it first)."""
+        self.actions.append(("pause", (seconds,)))
+        return self
+
+    def send(self) -> float:
+        return self.inputs.send(self.actions)
+
+
+class Input:
+    """The engine's input layer: explicit timing and per-action latency.
+
+    Nothing sleeps unless asked to: there is no implicit pause after an
+    action, and ``pause`` in a batch uses ``sleep`` (the engine's, so it
+    follows a virtual clock in replays). The time each action takes to go
+    out is kept in ``latency`` and, with ``metrics``, in the
+    "input_seconds" histogram labelled by action.
+    """
+
+    def __init__(self, backend: Optional[InputBackend] = None, metrics: Optional[Metrics] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend or create_input()
+        self.metrics = metrics
+        self.sleep = sleep
+        self.latency: Dict[str, float] = {}
+
+    def move(self, x: float, y: float) -> float:
+        return self.send([("move", (x, y))])
+
+    def click(self, x: float, y: float) -> float:
+        return self.send([("click", (x, y))])
+
+    def press(self, key: str) -> float:
+        return self.send([("press", (key,))])
+
+    def batch(self) -> Batch:
+        return Batch(self)
+
+    def send(self, actions: List[Tuple[str, Tuple[Any, ...]]]) -> float:
+        """Run actions in order, flushing the backend once at the end and before every pause.
+
+        Returns the seconds spent sending, pauses excluded.
+        """
+        total = 0.0
+        pending: List[str] = []
+        start = time.perf_counter()
+
+        def flush() -> None:
+            nonlocal total
+            self.backend.flush()
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            # Actions flushed together share the time it took to send them
+            for kind in pending:
+                self._observe(kind, elapsed / len(pending))
+            pending.clear()
+
+        for kind, args in actions:
+            if kind == "pause":
+                if pending:
+                    flush()
+                self.sleep(args[0])
+                start = time.perf_counter()
+                continue
+            getattr(self.backend, kind)(*args)
+            pending.append(kind)
+        if pending:
+            flush()
+        if len(actions) > 1 and self.metrics is not None:
+            self.metrics.observe("input_batch_seconds", total)
+        return total
+
+    def _observe(self, kind: str, seconds: float) -> None:
+        self.latency[kind] = seconds
+        if self.metrics is not None:
+            self.metrics.observe("input_seconds", seconds, action=kind)
+
+    def close(self) -> None:
+        self.backend.close()
@@ -0,0 +1,403 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from capture import Box, CaptureBackend, clip, create_backend
+from matching import Frame, as_frame, match_coarse_to_fine, match_full, match_tiled
+from metrics import Metrics
+from templates import Template, TemplateRegistry, rescaled
+
+# UI scale factors relative to the captured templates: browser zoom levels
+# and the common Windows DPI settings.
+DPI_SCALES = (1.0, 0.8, 0.9, 1.1, 1.25, 1.5, 1.75, 2.0)
+
+
+class Match(NamedTuple):
+    """A template found on screen."""
+    name: str
+    box: Box
+    score: float
+
+
+class RegionMemory:
+    """Remembers where each template was last found, persisted as JSON between runs.
+
+    Positions are kept per screen size ("1920x1080"), like the UI scale
+    factor detected for each screen, so a file carried over from another
+    resolution doesn't point the search off screen. Also keeps per-template
+    counts of how often a found template was inside its remembered region
+    (hit) versus only found by a full-screen search (miss).
+    """
+
+    def __init__(self, path: Optional[str] = "positions.json"):
+        self.path = path
+        self.boxes: Dict[str, Dict[str, Box]] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.scales: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self, path: Optional[str] = None) -> None:
+        """Read the positions file, or another one (e.g. a recording's snapshot) without adopting its path."""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Files from before positions were kept per screen map names straight to boxes; drop those
+        self.boxes = {screen: {name: Box(*box) for name, box in boxes.items()}
+                      for screen, boxes in data.get("boxes", {}).items() if isinstance(boxes, dict)}
+        self.hits = dict(data.get("hits", {}))
+        self.misses = dict(data.get("misses", {}))
+        self.scales = dict(data.get("scales", {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "boxes": {screen: {name: list(box) for name, box in boxes.items()}
+                          for screen, boxes in self.boxes.items()},
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "scales": dict(self.scales),
+            }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        data = self.to_dict()
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, screen: str, name: str) -> Optional[Box]:
+        return self.boxes.get(screen, {}).get(name)
+
+    def remember(self, screen: str, name: str, box: Box) -> None:
+        """Store a new position on a screen size, writing the file only when it actually moved."""
+        with self._lock:
+            boxes = self.boxes.setdefault(screen, {})
+            changed = boxes.get(name) != box
+            boxes[name] = box
+        if changed:
+            self.save()
+
+    def remember_scale(self, screen: str, scale: float) -> None:
+        with self._lock:
+            changed = self.scales.get(screen) != scale
+            self.scales[screen] = scale
+        if changed:
+            self.save()
+
+    def record(self, name: str, hit: bool) -> None:
+        with self._lock:
+            counts = self.hits if hit else self.misses
+            counts[name] = counts.get(name, 0) + 1
+
+    def hit_ratio(self, name: Optional[str] = None) -> float:
+        """Fraction of finds that came from the remembered region, overall or for one name."""
+        if name is None:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        else:
+            hits, misses = self.hits.get(name, 0), self.misses.get(name, 0)
+        total = hits + misses
+        return hits / total if total else 0.0
+
+
+class Locator:
+    """Finds templates on screen by matching them against a single captured frame.
+
+    One screenshot is taken per tick and every candidate template is matched
+    against that same frame, so checking several buttons costs one capture.
+    When a RegionMemory is given, each template is first searched in a padded
+    region around where it was last found, and the whole frame is only
+    searched when that misses. Full-frame searches run coarse-to-fine at
+    ``pyramid`` scale (``interrupt_pyramid`` for interrupt templates, see
+    match_interrupts); 1.0 matches at full resolution only. Interrupts are
+    searched in full only every ``interrupt_every`` polls, on any poll that
+    finds one of the templates waited for, and when the caller asks for it.
+
+    Templates are matched at a single UI scale factor. When more than one
+    candidate is given in ``scales``, a run of ``recalibrate_after`` polls
+    without any hit triggers a sweep over the other scales; a scale that
+    finds a template becomes the active one and is remembered per screen
+    size. Failed sweeps double the wait before the next one.
+
+    With ``workers`` > 1, matching runs on a thread pool against the shared
+    frame: one job per candidate template, or horizontal tiles of the frame
+    when a single template needs a full-resolution search.
+
+    With ``metrics``, capture time and per-tick match time are recorded as
+    the "capture_seconds" and "match_seconds" histograms. Region grabs (frame
+    diff gates, settle waits, the seek bar) are labelled area="region", so
+    the unlabelled capture histogram is the full-frame cost of a poll.
+    """
+
+    def __init__(self, templates: TemplateRegistry, memory: Optional[RegionMemory] = None,
+                 padding: int = 60, backend: Optional[CaptureBackend] = None,
+                 pyramid: float = 0.5, interrupt_pyramid: float = 0.25, scales: Sequence[float] = (1.0,),
+                 recalibrate_after: int = 20, interrupt_every: int = 5, workers: int = 1,
+                 metrics: Optional[Metrics] = None):
+        self.templates = templates
+        self.memory = memory
+        self.padding = padding
+        self.backend = backend or create_backend()
+        self.pyramid = pyramid
+        self.interrupt_pyramid = interrupt_pyramid
+        self.scales = tuple(scales)
+        self.scale = self.scales[0]
+        self.recalibrate_after = recalibrate_after
+        self.interrupt_every = interrupt_every
+        self._interrupt_polls = 0
+        self._screen: Optional[str] = None
+        self._misses = 0
+        self._sweep_after = recalibrate_after
+        self.workers = workers
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="match") if workers > 1 else None
+
+    def template(self, name: str) -> Template:
+        """The named template at the active UI scale."""
+        return rescaled(self.templates.get(name), self.scale)
+
+    def capture(self, region: Optional[Box] = None) -> np.ndarray:
+        """Grab the screen, or just one region of it, as a BGR array."""
+        if self.metrics is None:
+            return self.backend.grab(region)
+        start = time.perf_counter()
+        frame = self.backend.grab(region)
+        if region is None:
+            self.metrics.observe("capture_seconds", time.perf_counter() - start)
+        else:
+            self.metrics.observe("capture_seconds", time.perf_counter() - start, area="region")
+        return frame
+
+    def match(self, frame: Union[Frame, np.ndarray], name: str, confidence: float = 0.8,
+              region: Optional[Box] = None, tiled: bool = False,
+              pyramid: Optional[float] = None) -> Optional[Match]:
+        """Match one template against an already captured frame, optionally within a region.
+
+        ``tiled`` splits full-resolution searches across the worker pool; it
+        must only be set from outside the pool. ``pyramid`` overrides the
+        coarse search scale for this match. A region outside the frame is
+        ignored and the whole frame searched.
+        """
+        pyramid = self.pyramid if pyramid is None else pyramid
+        frame = as_frame(frame)
+        if region is not None:
+            region = clip(region, frame.image.shape[1], frame.image.shape[0])
+        template = self.template(name)
+        full = partial(match_tiled, executor=self.executor, tiles=self.workers) \
+            if tiled and self.executor is not None else match_full
+        if region is not None:
+            left, top = region.left, region.top
+            image = frame.region(template.view, left, top, left + region.width, top + region.height)
+            score, (x, y) = match_full(image, template.image)
+        elif pyramid < 1.0:
+            left, top = 0, 0
+            score, (x, y) = match_coarse_to_fine(frame, template, confidence, pyramid, full=full)
+        else:
+            left, top = 0, 0
+            score, (x, y) = full(frame.view(template.view), template.image)
+        if score < confidence:
+            return None
+        return Match(name, Box(left + x, top + y, template.width, template.height), score)
+
+    def search_region(self, name: str) -> Optional[Box]:
+        """Padded region around the last known position of a template on the current screen size."""
+        if self.memory is None or self._screen is None:
+            return None
+        box = self.memory.get(self._screen, name)
+        if box is None:
+            return None
+        return self.around(box)
+
+    def around(self, box: Box) -> Box:
+        """``box`` grown by ``padding`` on every side."""
+        return Box(box.left - self.padding, box.top - self.padding,
+                   box.width + 2 * self.padding, box.height + 2 * self.padding)
+
+    def match_any(self, frame: Union[Frame, np.ndarray], names: Sequence[str], confidence: float = 0.8,
+                  best: bool = False, interrupts: Optional[Dict[str, float]] = None) -> Optional[Match]:
+        """Match several templates against one frame.
+
+        Remembered regions are tried for every candidate before falling back
+        to full-frame searches. Returns the first hit in ``names`` order, or
+        the highest-scoring hit when ``best`` is set.
+
+        ``interrupts`` (see match_interrupts) are searched in full before a
+        hit is learned or a scale sweep runs; when one is found it is
+        returned instead and nothing is remembered for ``names``.
+        """
+        frame = as_frame(frame)
+        self._use_screen(frame)
+        regions = {name: self.search_region(name) for name in names}
+        found = self._first_or_best(frame, [n for n in names if regions[n]], confidence, best, regions)
+        hit = found is not None
+        if found is None:
+            found = self._first_or_best(frame, names, confidence, best)
+        sweep = found is None and self._sweep_due()
+        if interrupts and (found is not None or sweep):
+            interrupt = self.match_interrupts(frame, interrupts)
+            if interrupt is not None:
+                return interrupt
+        if sweep:
+            found = self._sweep(frame, names, confidence, best)
+        if found is None:
+            return None
+
+        self._misses = 0
+        if self.memory is not None:
+            if hit or regions[found.name]:
+                # A miss means it was on screen, just not where we last saw it.
+                self.memory.record(found.name, hit=hit)
+            self.memory.remember(self._screen, found.name, found.box)
+        return found
+
+    def _use_screen(self, frame: Frame) -> None:
+        """Switch to the scale remembered for this screen size when the screen changes."""
+        height, width = frame.image.shape[:2]
+        screen = f"{width}x{height}"
+        if screen == self._screen:
+            return
+        self._screen = screen
+        if self.memory is not None and screen in self.memory.scales:
+            self.scale = self.memory.scales[screen]
+
+    def _sweep_due(self) -> bool:
+        """Count a poll without any hit; True when it is time to sweep the other scales."""
+        if len(self.scales) < 2:
+            return False
+        self._misses += 1
+        if self._misses < self._sweep_after:
+            return False
+        self._misses = 0
+        return True
+
+    def _sweep(self, frame: Frame, names: Sequence[str], confidence: float, best: bool) -> Optional[Match]:
+        found = self.calibrate(frame, names, confidence, best)
+        if found is None:
+            self._sweep_after = min(self._sweep_after * 2, self.recalibrate_after * 16)
+        else:
+            self._sweep_after = self.recalibrate_after
+        return found
+
+    def calibrate(self, frame: Union[Frame, np.ndarray], names: Sequence[str],
+                  confidence: float = 0.8, best: bool = False) -> Optional[Match]:
+        """Try every candidate scale on one frame and adopt the one that finds a template.
+
+        Returns the match found at the new scale, or None if no scale matched
+        (the active scale is then left unchanged).
+        """
+        frame = as_frame(frame)
+        self._use_screen(frame)
+        previous = self.scale
+        found = None
+        for scale in self.scales:
+            if scale == previous:
+                continue
+            self.scale = scale
+            match = self._first_or_best(frame, names, confidence, best)
+            if match is not None and (found is None or match.score > found[1].score):
+                found = (scale, match)
+        if found is None:
+            self.scale = previous
+            return None
+        self.scale, match = found
+        if self.memory is not None and self._screen is not None:
+            self.memory.remember_scale(self._screen, self.scale)
+        return match
+
+    def _first_or_best(self, frame: Frame, names: Sequence[str], confidence: float,
+                       best: bool, regions: Optional[Dict[str, Box]] = None) -> Optional[Match]:
+        regions = regions or {}
+        if self.executor is not None and len(names) > 1:
+            futures = [self.executor.submit(self.match, frame, name, confidence, regions.get(name))
+                       for name in names]
+            matches = [future.result() for future in futures]
+        else:
+            tiled = self.executor is not None
+            matches = (self.match(frame, name, confidence, regions.get(name), tiled) for name in names)
+
+        found = None
+        for match in matches:
+            if match is None:
+                continue
+            if not best:
+                return match
+            if found is None or match.score > found.score:
+                found = match
+        return found
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.backend.close()
+
+    def locate(self, name: str, confidence: float = 0.8) -> Optional[Match]:
+        """Capture the screen once and look for a single template."""
+        return self.match(self.capture(), name, confidence)
+
+    def match_interrupts(self, frame: Union[Frame, np.ndarray], interrupts: Dict[str, float],
+                         full: bool = True) -> Optional[Match]:
+        """Match templates that cut a wait short (name -> confidence) against an already captured frame.
+
+        Interrupts are expected to be absent on almost every poll, so misses
+        don't count towards re-calibrating the scale, and full-frame searches
+        start from the coarser ``interrupt_pyramid`` scale. Without ``full``
+        only remembered regions are searched.
+        """
+        frame = as_frame(frame)
+        self._use_screen(frame)
+        for name, confidence in interrupts.items():
+            region = self.search_region(name)
+            match = self.match(frame, name, confidence, region, pyramid=self.interrupt_pyramid) \
+                if region is not None or full else None
+            if match is None and region is not None and full:
+                match = self.match(frame, name, confidence, pyramid=self.interrupt_pyramid)
+            if match is not None:
+                if self.memory is not None:
+                    self.memory.remember(self._screen, name, match.box)
+                return match
+        return None
+
+    def locate_any(self, names: Sequence[str], confidence: float = 0.8, best: bool = False,
+                   interrupts: Optional[Dict[str, float]] = None,
+                   full_interrupts: bool = False) -> Optional[Match]:
+        """Capture the screen once and look for any of the given templates.
+
+        ``interrupts`` (name -> confidence) are checked against the same
+        frame first and win over ``names``: a button that looks like one of
+        them on a sign-in page or behind an error dialog is no hit, and its
+        position is not learned. Their remembered regions are searched on
+        every poll, the whole frame every ``interrupt_every`` polls, when
+        ``full_interrupts`` is set (e.g. the screen just changed) and
+        whenever ``names`` would otherwise produce a hit.
+        """
+        frame = as_frame(self.capture())
+        start = time.perf_counter()
+        match = None
+        if interrupts:
+            full = full_interrupts or self._interrupt_polls % self.interrupt_every == 0
+            self._interrupt_polls += 1
+            match = self.match_interrupts(frame, interrupts, full=full)
+            # Searched in full already; match_any need not do it again
+            interrupts = None if full else interrupts
+        if match is None:
+            match = self.match_any(frame, names, confidence, best, interrupts=interrupts)
+        if self.metrics is not None:
+            self.metrics.observe("match_seconds", time.perf_counter() - start)
+        return match
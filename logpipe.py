@@ -0,0 +1,118 @@
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import tkinter as tk
+from typing import List, NamedTuple, Optional
+
+
+class LogRecord(NamedTuple):
+    created: float
+    level: str
+    message: str
+
+
+def history_logger(path: str, max_bytes: int = 5 * 1024 * 1024, backups: int = 5) -> logging.Logger:
+    """A logger that appends plain text to a size-rotated file (path, path.1, ...)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    logger = logging.getLogger(f"activity.{os.path.abspath(path)}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+
+class LogPipeline:
+    """Moves log lines from worker threads into a Tk text widget in batches.
+
+    ``push`` only puts a record on a SimpleQueue, so it is safe to call from
+    the automation thread and never touches Tk. The Tk main loop drains the
+    queue every ``interval_ms`` and inserts the whole batch with a single
+    ``Text.insert`` call (chars/tags pairs) followed by one ``see``.
+
+    Only the newest ``max_lines`` lines are kept in the widget; once it
+    holds more than 10% over that, the oldest lines are deleted in one call.
+    When a ``history`` logger is given, every batch is also appended to it,
+    so the full record survives on disk.
+    """
+
+    def __init__(self, root: tk.Misc, widget: tk.Text, interval_ms: int = 100, max_batch: int = 1000,
+                 max_lines: int = 5000, history: Optional[logging.Logger] = None):
+        self.root = root
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.max_lines = max_lines
+        self.history = history
+        self.records: "queue.SimpleQueue[LogRecord]" = queue.SimpleQueue()
+        self._after_id = None
+
+    def push(self, message: str, level: str = "INFO") -> None:
+        """Queue a message; callable from any thread."""
+        self.records.put(LogRecord(time.time(), level, message))
+
+    def start(self) -> None:
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self) -> None:
+        self.drain()
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def take(self) -> List[LogRecord]:
+        """Pop up to max_batch queued records without blocking."""
+        batch = []
+        try:
+            while len(batch) < self.max_batch:
+                batch.append(self.records.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def drain(self) -> int:
+        """Insert queued records into the widget; must run on the Tk thread."""
+        batch = self.take()
+        if not batch:
+            return 0
+        if self.history is not None:
+            # The history spans days of rotated files, so it gets the date too
+            self.history.info("\n".join(
+                f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r.created))}] [{r.level}] {r.message}"
+                for r in batch))
+
+        # Lines that would be trimmed straight away are never inserted
+        shown = batch[-self.max_lines:]
+        chunks = []
+        for record in shown:
+            chunks.extend((f"[{time.strftime('%H:%M:%S', time.localtime(record.created))}] ", "timestamp",
+                           f"[{record.level}] ", record.level,
+                           f"{record.message}\n", ()))
+        self.widget.insert(tk.END, *chunks)
+        self.trim()
+        self.widget.see(tk.END)
+        return len(batch)
+
+    def trim(self) -> None:
+        """Delete the oldest widget lines in bulk once over the limit by 10%."""
+        # Counted from the widget itself: a message can span several lines
+        lines = int(self.widget.index("end-1c").split(".")[0]) - 1
+        if lines <= self.max_lines + self.max_lines // 10:
+            return
+        excess = lines - self.max_lines
+        self.widget.delete("1.0", f"{excess + 1}.0")
+
+    def clear(self) -> None:
+        """Empty the widget; the history file is kept."""
+        self.widget.delete("1.0", tk.END)
@@ -1,23 +1,59 @@
-import pyautogui
 import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import json
+import os
+import threading
 import tkinter as tk
 from tkinter import scrolledtext, ttk
-from typing import Optional, Tuple
-import threading
+from typing import Dict, Optional
+
+# Only modules without the vision stack are imported up front; OpenCV,
+# numpy and pyautogui come in with the engine on a background thread once
+# the window is up (see VideoAutomationGUI.load_engine).
+from events import EventLog
+from exporter import add_arguments, serve
+from flow import DEFAULT_FLOW
+from logpipe import LogPipeline, history_logger
+from metrics import Metrics
+
+MAX_LOG_LINES = 5000
+ACTIVITY_LOG = os.path.join("logs", "activity.log")
+STATS_REFRESH_MS = 1000
+COUNTS_REFRESH_MS = 100
+ENGINE_CHECK_MS = 50
+
+# (histogram, label, unit scale, unit) rows of the performance card
+PERF_ROWS = (
+    ("capture_seconds", "capture", 1000, "ms"),
+    ("match_seconds", "match", 1000, "ms"),
+    ("wait_polls", "polls/wait", 1, ""),
+    ("cycle_seconds", "cycle", 1, "s"),
+)
 
 
 class VideoAutomationGUI:
-    def __init__(self, root):
+    def __init__(self, root, flow_path: str = DEFAULT_FLOW, on_ready=None, workers: Optional[int] = None):
         self.root = root
         self.root.title("Video Automation Controller")
         self.root.geometry("900x650")
         self.root.resizable(True, True)
         self.root.configure(bg="#f0f0f0")
 
-        self.is_running = False
-        self.automation_thread = None
-        self.cycle_count = 0
-        self.none_video_count = 0
+        # The automation core; the GUI only starts/stops it and shows what it reports.
+        # It is built by load_engine in the background, so it is None until then.
+        self.flow_path = flow_path
+        self.workers = workers
+        self.engine = None
+        self.engine_error: Optional[BaseException] = None
+        # Set by the automation thread, picked up by refresh_counts on the Tk loop
+        self.counts_changed = threading.Event()
+        self.events = EventLog().start()
+        self.metrics = Metrics()
+        self.on_ready = on_ready
+        self.timings: Dict[str, float] = {}
 
         # Color scheme
         self.colors = {
@@ -32,6 +68,11 @@ class VideoAutomationGUI:
         }
 
         self.setup_ui()
+        self.root.after(COUNTS_REFRESH_MS, self.refresh_counts)
+        self.root.after_idle(self.mark_shown)
+        self.loader = threading.Thread(target=self.load_engine, name="engine-loader", daemon=True)
+        self.loader.start()
+        self.root.after(ENGINE_CHECK_MS, self.check_engine)
 
     def setup_ui(self):
         # Main container with padding
@@ -74,17 +115,19 @@ class VideoAutomationGUI:
         button_container = tk.Frame(control_inner, bg=self.colors['card'])
         button_container.pack()
 
+        # Enabled by check_engine once the engine has loaded
         self.start_button = tk.Button(
             button_container,
-            text="▶ Start Automation",
+            text="Loading...",
             command=self.start_automation,
-            bg=self.colors['success'],
+            bg="#cccccc",
             fg="white",
             font=("Segoe UI", 11, "bold"),
             width=18,
             height=2,
             relief=tk.FLAT,
             cursor="hand2",
+            state=tk.DISABLED,
             activebackground="#45a049"
         )
         self.start_button.pack(side=tk.LEFT, padx=5)
@@ -133,6 +176,15 @@ class VideoAutomationGUI:
         )
         self.status_label.pack(pady=(5, 0))
 
+        self.eta_label = tk.Label(
+            status_content,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.colors['card'],
+            fg=self.colors['text_light']
+        )
+        self.eta_label.pack()
+
         # Cycles Card
         cycles_card = tk.Frame(stats_frame, bg=self.colors['card'], relief=tk.FLAT)
         cycles_card.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
@@ -159,7 +211,7 @@ class VideoAutomationGUI:
 
         # None Videos Card
         none_card = tk.Frame(stats_frame, bg=self.colors['card'], relief=tk.FLAT)
-        none_card.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0))
+        none_card.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
 
         none_content = tk.Frame(none_card, bg=self.colors['card'])
         none_content.pack(pady=15, padx=20)
@@ -181,6 +233,47 @@ class VideoAutomationGUI:
         )
         self.none_video_label.pack(pady=(5, 0))
 
+        # Performance Card
+        perf_card = tk.Frame(stats_frame, bg=self.colors['card'], relief=tk.FLAT)
+        perf_card.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0))
+
+        perf_content = tk.Frame(perf_card, bg=self.colors['card'])
+        perf_content.pack(pady=10, padx=15)
+
+        perf_header = tk.Frame(perf_content, bg=self.colors['card'])
+        perf_header.pack(fill=tk.X)
+
+        tk.Label(
+            perf_header,
+            text="Performance (p50 / p95 / p99)",
+            font=("Segoe UI", 9),
+            bg=self.colors['card'],
+            fg=self.colors['text_light']
+        ).pack(side=tk.LEFT)
+
+        tk.Button(
+            perf_header,
+            text="Export",
+            command=self.export_stats,
+            font=("Segoe UI", 8),
+            bg=self.colors['bg'],
+            fg=self.colors['text'],
+            relief=tk.FLAT,
+            cursor="hand2",
+            padx=8
+        ).pack(side=tk.RIGHT, padx=(10, 0))
+
+        self.perf_label = tk.Label(
+            perf_content,
+            text="No data yet",
+            font=("Consolas", 8),
+            justify=tk.LEFT,
+            bg=self.colors['card'],
+            fg=self.colors['text']
+        )
+        self.perf_label.pack(anchor=tk.W, pady=(5, 0))
+        self.root.after(STATS_REFRESH_MS, self.refresh_stats)
+
         # Log Section
         log_frame = tk.Frame(main_container, bg=self.colors['card'], relief=tk.FLAT)
         log_frame.pack(fill=tk.BOTH, expand=True)
@@ -235,208 +328,171 @@ class VideoAutomationGUI:
         self.log_text.tag_config("WARNING", foreground="#FF9800")
         self.log_text.tag_config("ERROR", foreground="#f44336", font=("Consolas", 9, "bold"))
 
-    def log(self, message: str, level: str = "INFO"):
-        """Add a log message to the text area with color coding."""
-        timestamp = time.strftime("%H:%M:%S")
-
-        # Insert timestamp
-        self.log_text.insert(tk.END, f"[{timestamp}] ", "timestamp")
-
-        # Insert level with tag
-        self.log_text.insert(tk.END, f"[{level}] ", level)
-
-        # Insert message
-        self.log_text.insert(tk.END, f"{message}\n")
+        # Worker threads queue log lines; the Tk loop inserts them in batches.
+        # The widget keeps the newest MAX_LOG_LINES, the full history goes to disk.
+        try:
+            history = history_logger(ACTIVITY_LOG)
+        except OSError:
+            history = None
+        self.log_pipeline = LogPipeline(self.root, self.log_text, max_lines=MAX_LOG_LINES, history=history)
+        self.log_pipeline.start()
 
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+    def log(self, message: str, level: str = "INFO"):
+        """Queue a color-coded log message; safe to call from the automation thread."""
+        self.log_pipeline.push(message, level)
 
     def clear_logs(self):
         """Clear all logs."""
-        self.log_text.delete(1.0, tk.END)
+        self.log_pipeline.drain()
+        self.log_pipeline.clear()
         self.log("Logs cleared", "INFO")
 
+    def refresh_stats(self):
+        """Redraw the performance card from the metrics histograms."""
+        summaries = {h["name"]: h for h in self.metrics.snapshot()["histograms"] if not h["labels"]}
+        lines = []
+        for name, label, scale, unit in PERF_ROWS:
+            summary = summaries.get(name)
+            if summary is None:
+                lines.append(f"{label:<11} -")
+                continue
+            digits = 1 if unit else 0
+            values = " / ".join(f"{summary[q] * scale:.{digits}f}" for q in ("p50", "p95", "p99"))
+            lines.append(f"{label:<11} {values} {unit}".rstrip())
+        self.perf_label.config(text="\n".join(lines))
+        self.update_eta()
+        self.root.after(STATS_REFRESH_MS, self.refresh_stats)
+
+    def export_stats(self):
+        """Write a snapshot of all metrics to a JSON file under logs/."""
+        path = os.path.join("logs", time.strftime("stats-%Y%m%d-%H%M%S.json"))
+        try:
+            self.metrics.export(path)
+        except OSError as e:
+            self.log(f"Could not export stats: {e}", "ERROR")
+            return
+        self.log(f"Stats exported to {path}", "SUCCESS")
+
+    def mark_shown(self):
+        """Record when the window was first drawn."""
+        self.timings["window_seconds"] = time.perf_counter() - STARTED
+
+    def load_engine(self):
+        """Import the vision stack, build the engine and warm it up; runs on the loader thread."""
+        try:
+            start = time.perf_counter()
+            from engine import Engine
+            self.timings["import_seconds"] = time.perf_counter() - start
+            engine = Engine(self.flow_path, log=self.log, on_update=self.counts_changed.set,
+                            events=self.events, metrics=self.metrics, workers=self.workers)
+            if not engine.load_flow():
+                raise ValueError(f"could not load flow {self.flow_path}")
+            engine.load_templates()
+            start = time.perf_counter()
+            engine.locator.capture()
+            self.timings["first_frame_seconds"] = time.perf_counter() - start
+        except Exception as e:
+            self.engine_error = e
+            return
+        self.engine = engine
+
+    def check_engine(self):
+        """Enable the Start button once the loader thread is done."""
+        if self.loader.is_alive():
+            self.root.after(ENGINE_CHECK_MS, self.check_engine)
+            return
+        if self.engine is None:
+            self.log(f"Could not start the automation engine: {self.engine_error}", "ERROR")
+            self.update_status("Failed to load", self.colors['danger'])
+            self.start_button.config(text="▶ Start Automation")
+        else:
+            self.timings["ready_seconds"] = time.perf_counter() - STARTED
+            self.metrics.observe("startup_seconds", self.timings["ready_seconds"])
+            self.events.emit("startup", **{k: round(v, 3) for k, v in self.timings.items()})
+            self.log(f"Ready in {self.timings['ready_seconds']:.2f}s "
+                     f"(window shown after {self.timings.get('window_seconds', 0):.2f}s)", "INFO")
+            self.start_button.config(text="▶ Start Automation", state=tk.NORMAL, bg=self.colors['success'])
+        if self.on_ready is not None:
+            self.on_ready(self)
+
     def update_status(self, status: str, color: str = "black"):
         """Update the status label."""
         self.status_label.config(text=status, fg=color)
 
-    def update_cycle_count(self):
-        """Update the cycle count label."""
-        self.cycle_label.config(text=str(self.cycle_count))
-
-    def update_none_video_count(self):
-        """Update the none video count label."""
-        self.none_video_label.config(text=str(self.none_video_count))
+    def refresh_counts(self):
+        """Redraw the counters when the engine reported a change since the last check."""
+        if self.engine is not None and self.counts_changed.is_set():
+            self.counts_changed.clear()
+            self.update_counts()
+        self.root.after(COUNTS_REFRESH_MS, self.refresh_counts)
+
+    def update_counts(self):
+        """Update the cycle and none video count labels (Tk thread only)."""
+        self.cycle_label.config(text=str(self.engine.cycle_count))
+        self.none_video_label.config(text=str(self.engine.none_video_count))
+        self.update_eta()
+
+    def update_eta(self):
+        """Show how long the current video should still play, from the seek bar."""
+        end = self.engine.playback_end if self.engine is not None else None
+        if end is None:
+            self.eta_label.config(text="")
+            return
+        minutes, seconds = divmod(int(max(end - self.engine.clock(), 0)), 60)
+        self.eta_label.config(text=f"Video ends in ~{minutes}:{seconds:02d}")
 
     def start_automation(self):
         """Start the automation process."""
-        self.is_running = True
-        self.cycle_count = 0
-        self.none_video_count = 0
-        self.update_cycle_count()
-        self.update_none_video_count()
-
         self.start_button.config(state=tk.DISABLED, bg="#cccccc")
         self.stop_button.config(state=tk.NORMAL, bg=self.colors['danger'])
         self.update_status("Running", self.colors['success'])
 
-        self.log("Automation started - waiting 5 seconds before beginning...", "INFO")
+        self.log(f"Automation started - first cycle in {self.engine.start_delay:g} seconds, "
+                 f"switch to the browser now...", "INFO")
 
-        # Start automation in a separate thread
-        self.automation_thread = threading.Thread(target=self.run_automation, daemon=True)
-        self.automation_thread.start()
+        # Run the engine in a separate thread
+        self.engine.start()
 
     def stop_automation(self):
         """Stop the automation process."""
-        self.is_running = False
+        self.engine.stop()
         self.start_button.config(state=tk.NORMAL, bg=self.colors['success'])
         self.stop_button.config(state=tk.DISABLED, bg="#cccccc")
         self.update_status("Stopped", self.colors['danger'])
-        self.log(f"Automation stopped by user after {self.cycle_count} cycles ({self.none_video_count} none videos)",
-                 "INFO")
-
-    def wait_for_image(self, image_path: str, confidence: float = 0.8,
-                       timeout: int = 30, check_interval: float = 0.5) -> Optional[Tuple[int, int, int, int]]:
-        """Wait for an image to appear on screen."""
-        start_time = time.time()
-        while time.time() - start_time < timeout and self.is_running:
-            try:
-                location = pyautogui.locateOnScreen(image_path, confidence=confidence)
-                if location:
-                    return location
-            except pyautogui.ImageNotFoundException:
-                pass
-            time.sleep(check_interval)
-        return None
-
-    def click_center(self, location: Tuple[int, int, int, int]) -> None:
-        """Click the center of a located image."""
-        x, y, w, h = location
-        pyautogui.click(x + w / 2, y + h / 2)
-
-    def handle_none_video(self) -> bool:
-        """Handle videos that don't have play/fullscreen buttons (none videos)."""
-        self.log("Detected none video - skipping directly to next", "INFO")
-        self.none_video_count += 1
-        self.update_none_video_count()
-
-        time.sleep(1)
-
-        # Click next button
-        self.log("Looking for next button...", "INFO")
-        next_images = ["next1.png", "next2.png"]
-        next_clicked = False
-
-        for img in next_images:
-            self.log(f"Trying to locate {img}...", "INFO")
-            next_location = self.wait_for_image(img, confidence=0.7, timeout=5)
-            if next_location:
-                self.log(f"Found {img}, clicking", "INFO")
-                self.click_center(next_location)
-                next_clicked = True
-                break
-
-        if not next_clicked:
-            self.log("No next button found", "WARNING")
-            return False
-
-        self.log("None video handled successfully", "SUCCESS")
-        return True
-
-    def process_video(self) -> bool:
-        """Process one video cycle."""
-        try:
-            # Check for play button with shorter timeout
-            self.log("Looking for play button...", "INFO")
-            play_location = self.wait_for_image('play.png', confidence=0.8, timeout=5)
-
-            if not play_location:
-                # No play button found - this is a none video
-                self.log("Play button not found - treating as none video", "INFO")
-                return self.handle_none_video()
-
-            # Play button found - this is a regular video, proceed with full flow
-            self.log("Play button found - processing as regular video", "INFO")
-            self.log("Clicking play button", "INFO")
-            self.click_center(play_location)
-            time.sleep(2)
-
-            # Click fullscreen button
-            self.log("Looking for fullscreen button...", "INFO")
-            fullscreen_location = self.wait_for_image('fullscreen.png', confidence=0.8, timeout=30)
-
-            if not fullscreen_location:
-                # Play button was found but fullscreen is missing - this is an error
-                self.log("Fullscreen button not found after clicking play", "ERROR")
-                return False
-
-            self.log("Clicking fullscreen button", "INFO")
-            self.click_center(fullscreen_location)
-
-            # Wait for video to end
-            self.log("Waiting for video to end...", "INFO")
-            out_location = self.wait_for_image('out.png', confidence=0.8, timeout=3600)
-            if not out_location:
-                self.log("Video end indicator not found within timeout", "ERROR")
-                return False
-
-            self.log("Video ended, pressing ESC", "INFO")
-            pyautogui.press('esc')
-            time.sleep(2)
-
-            # Click next button
-            self.log("Looking for next button...", "INFO")
-            next_images = ["next1.png", "next2.png"]
-            next_clicked = False
-
-            for img in next_images:
-                self.log(f"Trying to locate {img}...", "INFO")
-                next_location = self.wait_for_image(img, confidence=0.7, timeout=5)
-                if next_location:
-                    self.log(f"Found {img}, clicking", "INFO")
-                    self.click_center(next_location)
-                    next_clicked = True
-                    break
-
-            if not next_clicked:
-                self.log("No next button found", "WARNING")
-                return False
-
-            self.log("Video cycle completed successfully", "SUCCESS")
-            return True
-
-        except Exception as e:
-            self.log(f"Error in video processing: {e}", "ERROR")
-            return False
-
-    def run_automation(self):
-        """Main automation loop."""
-        time.sleep(5)
-
-        while self.is_running:
-            self.cycle_count += 1
-            self.update_cycle_count()
+        self.log(f"Automation stopped by user after {self.engine.cycle_count} cycles "
+                 f"({self.engine.none_video_count} none videos)", "INFO")
+        self.engine.save()
 
-            self.log("=" * 60, "INFO")
-            self.log(f"Starting cycle #{self.cycle_count}", "INFO")
-            self.log("=" * 60, "INFO")
 
-            success = self.process_video()
-
-            if not success:
-                self.log(f"Cycle #{self.cycle_count} failed. Retrying in 5 seconds...", "WARNING")
-                time.sleep(5)
-            else:
-                self.log(f"Cycle #{self.cycle_count} completed successfully", "SUCCESS")
-                time.sleep(2)
-
-        self.log("Automation loop exited", "INFO")
+def print_startup_report(app: VideoAutomationGUI) -> None:
+    """Print the startup timings as JSON and close the window (--startup-report)."""
+    print(json.dumps(dict(app.timings, ok=app.engine is not None)), flush=True)
+    app.root.destroy()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Video automation GUI")
+    parser.add_argument("flow", nargs="?", default=DEFAULT_FLOW, help="flow definition (JSON)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print startup timings as JSON and exit once the engine is ready")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="template matching threads (default: one per core, up to 4)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = VideoAutomationGUI(root)
+    app = VideoAutomationGUI(root, args.flow, on_ready=print_startup_report if args.startup_report else None,
+                             workers=args.workers)
+    server = None
+    if args.metrics_port is not None:
+        server = serve(app.metrics, args.metrics_host, args.metrics_port, app.log)
     root.mainloop()
+    if server is not None:
+        server.close()
+    if app.engine is not None:
+        app.engine.close()
+    else:
+        app.events.close()
 
 
 if __name__ == "__main__":
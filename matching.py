@@ -0,0 +1,214 @@
+import threading
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Tuple, Union
+
+import cv2
+import numpy as np
+
+from templates import Template, preprocess
+
+
+# Below this size (in pixels, at the coarse scale) a template carries too
+# little detail for the coarse pass to be trusted.
+MIN_COARSE_SIDE = 12
+
+
+COLOR = ('color', 0)
+
+
+class Frame:
+    """One captured frame plus derived images, computed at most once per tick.
+
+    Matching several templates against the same capture reuses the
+    converted (gray, single channel, edges) and downscaled copies instead
+    of preparing the frame again for every template.
+    """
+
+    def __init__(self, image: np.ndarray):
+        self.image = image
+        self._views: Dict[Tuple[Tuple[str, int], float], np.ndarray] = {(COLOR, 1.0): image}
+        self._lock = threading.Lock()
+
+    def view(self, view: Tuple[str, int] = COLOR, scale: float = 1.0) -> np.ndarray:
+        """The frame preprocessed for a template view (see Template.view), optionally downscaled."""
+        key = (view, scale)
+        with self._lock:
+            cached = self._views.get(key)
+        if cached is not None:
+            return cached
+        if scale == 1.0:
+            image = preprocess(self.image, view)
+        else:
+            image = cv2.resize(self.view(view), None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        with self._lock:
+            return self._views.setdefault(key, image)
+
+    def region(self, view: Tuple[str, int], left: int, top: int, right: int, bottom: int) -> np.ndarray:
+        """Part of a view; only that part is preprocessed unless the whole view already exists.
+
+        The bounds are clipped to the frame, which the caller must make sure
+        they overlap.
+        """
+        height, width = self.image.shape[:2]
+        left, top, right, bottom = max(left, 0), max(top, 0), min(right, width), min(bottom, height)
+        with self._lock:
+            cached = self._views.get((view, 1.0))
+        if cached is not None:
+            return cached[top:bottom, left:right]
+        return preprocess(self.image[top:bottom, left:right], view)
+
+
+def as_frame(frame: Union[Frame, np.ndarray]) -> Frame:
+    return frame if isinstance(frame, Frame) else Frame(frame)
+
+
+def scaled_template(template: Template, scale: float) -> np.ndarray:
+    """Downscaled copy of a template's preprocessed image, cached on the template."""
+    if scale == 1.0:
+        return template.image
+    cached = template.variants.get(("scaled", scale))
+    if cached is None:
+        cached = cv2.resize(template.image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        template.variants[("scaled", scale)] = cached
+    return cached
+
+
+def match_full(image: np.ndarray, templ: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+    """Best TM_CCOEFF_NORMED score and its top-left position."""
+    if image.shape[0] < templ.shape[0] or image.shape[1] < templ.shape[1]:
+        return -1.0, (0, 0)
+    result = cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED)
+    _, score, _, location = cv2.minMaxLoc(result)
+    return float(score), location
+
+
+def match_tiled(image: np.ndarray, templ: np.ndarray, executor: Executor,
+                tiles: int) -> Tuple[float, Tuple[int, int]]:
+    """match_full split into horizontal strips that run on ``executor``.
+
+    Strips overlap by the template height so no placement is lost.
+    cv2.matchTemplate releases the GIL, so the strips run on separate cores.
+    Must not be called from inside one of the executor's own workers.
+    """
+    height, t_height = image.shape[0], templ.shape[0]
+    positions = height - t_height + 1
+    if tiles < 2 or positions < 2 * tiles:
+        return match_full(image, templ)
+    step = -(-positions // tiles)
+    futures = [(y0, executor.submit(match_full, image[y0:min(y0 + step + t_height - 1, height)], templ))
+               for y0 in range(0, positions, step)]
+    best_score, best_location = -1.0, (0, 0)
+    for y0, future in futures:
+        score, (x, y) = future.result()
+        if score > best_score:
+            best_score, best_location = score, (x, y0 + y)
+    return best_score, best_location
+
+
+def _peaks(result: np.ndarray, count: int, threshold: float,
+           suppress: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Top ``count`` peaks above ``threshold``, suppressing neighbours of each pick."""
+    result = result.copy()
+    peaks = []
+    sup_w, sup_h = suppress
+    for _ in range(count):
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        if score < threshold:
+            break
+        peaks.append((x, y))
+        result[max(y - sup_h, 0):y + sup_h + 1, max(x - sup_w, 0):x + sup_w + 1] = -1.0
+    return peaks
+
+
+def _survives_downscale(template: Template, scale: float, threshold: float) -> bool:
+    """Does the template still match itself after downscaling, at every pixel phase?
+
+    Thin-lined icons can lose most of their detail at a coarse scale depending
+    on how they line up with the downsampling grid and on what surrounds
+    them, so each pixel phase is checked on both a blended and a contrasting
+    background.
+    """
+    small_templ = scaled_template(template, scale)
+    step = max(int(round(1.0 / scale)), 1)
+    border = 2 * step
+    inverse = [255 - int(c) for c in cv2.mean(template.color)[:3]]
+    # Padded in color and then preprocessed, the way a frame would be
+    surroundings = [
+        cv2.copyMakeBorder(template.color, border, border, border, border, cv2.BORDER_REPLICATE),
+        cv2.copyMakeBorder(template.color, border, border, border, border, cv2.BORDER_CONSTANT,
+                           value=inverse),
+    ]
+    for padded in surroundings:
+        padded = preprocess(padded, template.view)
+        for dy in range(step):
+            for dx in range(step):
+                shifted = padded[dy:, dx:]
+                small = cv2.resize(shifted, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                score, _ = match_full(small, small_templ)
+                if score < threshold:
+                    return False
+    return True
+
+
+def coarse_scale(template: Template, scale: float, threshold: float = 0.6) -> float:
+    """Smallest scale >= ``scale`` at which the coarse pass can still find the template.
+
+    The scale is raised for templates that would shrink below MIN_COARSE_SIDE
+    pixels or whose detail doesn't survive downscaling. The answer is cached
+    on the template; 1.0 means the coarse pass should be skipped.
+    """
+    key = ("coarse_scale", scale, threshold)
+    if key in template.variants:
+        return template.variants[key]
+    smallest = min(template.width, template.height)
+    chosen = 1.0
+    candidate = max(scale, MIN_COARSE_SIDE / smallest)
+    while candidate < 1.0:
+        if _survives_downscale(template, candidate, threshold):
+            chosen = candidate
+            break
+        candidate *= 1.5
+    template.variants[key] = chosen
+    return chosen
+
+
+def match_coarse_to_fine(frame: Frame, template: Template, confidence: float = 0.8,
+                         scale: float = 0.5, candidates: int = 3, coarse_margin: float = 0.2,
+                         full: Callable[[np.ndarray, np.ndarray], Tuple[float, Tuple[int, int]]] = match_full
+                         ) -> Tuple[float, Tuple[int, int]]:
+    """Find a template by matching a downscaled frame first, then refining.
+
+    The coarse pass runs at ``scale`` (raised for templates too small or thin
+    to survive it, see coarse_scale) and keeps
+    the best ``candidates`` peaks scoring no more than ``coarse_margin`` below
+    ``confidence``, since downscaling blurs away some of the match. Each peak
+    is then re-matched at full resolution in a small window around its
+    projected position. Returns the same (score, (x, y)) pair as match_full.
+    ``full`` is used instead when the template has to be matched at full
+    resolution.
+    """
+    threshold = confidence - coarse_margin
+    scale = coarse_scale(template, scale, threshold)
+    image = frame.view(template.view)
+    if scale >= 1.0:
+        return full(image, template.image)
+
+    small_frame = frame.view(template.view, scale)
+    small_templ = scaled_template(template, scale)
+    if small_frame.shape[0] < small_templ.shape[0] or small_frame.shape[1] < small_templ.shape[1]:
+        return -1.0, (0, 0)
+    result = cv2.matchTemplate(small_frame, small_templ, cv2.TM_CCOEFF_NORMED)
+    suppress = (max(small_templ.shape[1] // 2, 1), max(small_templ.shape[0] // 2, 1))
+    peaks = _peaks(result, candidates, threshold, suppress)
+
+    pad = int(np.ceil(1.0 / scale)) + 2
+    best_score, best_location = -1.0, (0, 0)
+    for cx, cy in peaks:
+        x0 = max(int(cx / scale) - pad, 0)
+        y0 = max(int(cy / scale) - pad, 0)
+        x1 = min(int(cx / scale) + pad + template.width, image.shape[1])
+        y1 = min(int(cy / scale) + pad + template.height, image.shape[0])
+        score, (x, y) = match_full(image[y0:y1, x0:x1], template.image)
+        if score > best_score:
+            best_score, best_location = score, (x0 + x, y0 + y)
+    return best_score, best_location
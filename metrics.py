@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the histogram buckets, from 1 ms to 1 h
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _pick(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(int(q / 100.0 * len(ordered)), len(ordered) - 1)]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples for percentiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 5000):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentile(self, q: float) -> Optional[float]:
+        return _pick(sorted(self.recent), q)
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, as Prometheus buckets expect."""
+        total, pairs = 0, []
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.recent)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "p50": _pick(ordered, 50),
+            "p95": _pick(ordered, 95),
+            "p99": _pick(ordered, 99),
+        }
+
+
+class Metrics:
+    """In-memory counters and histograms for the automation hot path.
+
+    Recording is a dictionary lookup and a few additions under a lock, so it
+    can sit around every capture and match. Names may carry labels, e.g.
+    ``observe("step_seconds", 0.4, state="find_play")``.
+    """
+
+    COUNT_HISTOGRAMS = ("wait_polls",)
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def uptime(self) -> float:
+        return time.time() - self.started
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                buckets = COUNT_BUCKETS if name in self.COUNT_HISTOGRAMS else DEFAULT_BUCKETS
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything recorded so far as plain JSON-serialisable data."""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [dict(name=name, labels=dict(labels), **histogram.summary())
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+        return {
+            "started": self.started,
+            "taken": time.time(),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def collect(self) -> Tuple[List[Tuple[str, Dict[str, str], float]],
+                               List[Tuple[str, Dict[str, str], List[Tuple[float, int]], int, float]]]:
+        """Counters as (name, labels, value) and histograms as
+        (name, labels, cumulative buckets, count, sum), copied under the lock."""
+        with self._lock:
+            counters = [(name, dict(labels), value) for (name, labels), value in sorted(self.counters.items())]
+            histograms = [(name, dict(labels), histogram.cumulative(), histogram.count, histogram.sum)
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+        return counters, histograms
+
+    def export(self, path: str) -> str:
+        """Write a snapshot as JSON and return the path."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
@@ -0,0 +1,168 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class PollStrategy:
+    """Decides how long to sleep between polls of one wait."""
+
+    def reset(self) -> None:
+        """Called by the scheduler at the start of every wait."""
+
+    def next_interval(self, elapsed: float) -> float:
+        raise NotImplementedError
+
+
+class Fixed(PollStrategy):
+    """Poll at a constant interval (the old check_interval behaviour)."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+
+    def next_interval(self, elapsed: float) -> float:
+        return self.interval
+
+
+class Backoff(PollStrategy):
+    """Poll quickly while the UI is expected to change, then back off exponentially.
+
+    For the first ``fast_for`` seconds polls run every ``fast_interval``
+    (e.g. right after a click). After that the interval starts at
+    ``initial`` and is multiplied by ``factor`` each poll, up to ``cap``.
+    """
+
+    def __init__(self, initial: float = 0.5, factor: float = 1.5, cap: float = 5.0,
+                 fast_for: float = 0.0, fast_interval: float = 0.1):
+        self.initial = initial
+        self.factor = factor
+        self.cap = cap
+        self.fast_for = fast_for
+        self.fast_interval = fast_interval
+        self._current = initial
+
+    def reset(self) -> None:
+        self._current = self.initial
+
+    def next_interval(self, elapsed: float) -> float:
+        if elapsed < self.fast_for:
+            return self.fast_interval
+        interval = self._current
+        self._current = min(self.cap, self._current * self.factor)
+        return min(self.cap, interval)
+
+
+class ExpectedDuration(PollStrategy):
+    """Poll rarely until close to an expected end time, then densely around it.
+
+    Polls every ``sparse`` seconds (or less, to land exactly on the window)
+    until ``window`` seconds before ``expected``, every ``dense`` seconds
+    within ``window`` of it, and backs off gradually again once the
+    expected end has been overrun.
+    """
+
+    def __init__(self, expected: float, dense: float = 0.25, sparse: float = 10.0,
+                 window: float = 15.0):
+        self.expected = expected
+        self.dense = dense
+        self.sparse = sparse
+        self.window = window
+
+    def next_interval(self, elapsed: float) -> float:
+        remaining = self.expected - elapsed
+        if remaining > self.window:
+            return max(self.dense, min(self.sparse, remaining - self.window))
+        if remaining > -self.window:
+            return self.dense
+        overrun = -remaining - self.window
+        return min(self.sparse, self.dense * (1 + overrun / self.window))
+
+
+@dataclass
+class WaitStats:
+    """What happened during one wait."""
+    polls: int = 0
+    elapsed: float = 0.0
+    found: bool = False
+    latency: float = 0.0
+
+    def describe(self) -> str:
+        if self.found:
+            return (f"{self.polls} polls in {self.elapsed:.1f}s, "
+                    f"detected within {self.latency:.2f}s of appearing")
+        return f"{self.polls} polls in {self.elapsed:.1f}s, not found"
+
+
+class PollScheduler:
+    """Runs a poll function until it returns something, a timeout, or a stop request.
+
+    ``stats`` describes the last wait. ``latency`` is the gap between the
+    last two polls before a hit, which bounds how long the target was on
+    screen before it was detected.
+    """
+
+    def __init__(self, strategy: Optional[PollStrategy] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.strategy = strategy or Fixed()
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = WaitStats()
+
+    def wait(self, poll: Callable[[], Optional[T]], timeout: float,
+             keep_going: Callable[[], bool] = lambda: True) -> Optional[T]:
+        self.strategy.reset()
+        self.stats = stats = WaitStats()
+        start = self.clock()
+        interval = 0.0
+
+        while keep_going():
+            elapsed = self.clock() - start
+            if elapsed >= timeout:
+                break
+            result = poll()
+            stats.polls += 1
+            if result is not None:
+                stats.found = True
+                stats.latency = interval
+                stats.elapsed = self.clock() - start
+                return result
+
+            elapsed = self.clock() - start
+            interval = min(self.strategy.next_interval(elapsed), max(timeout - elapsed, 0.0))
+            self.sleep(interval)
+
+        stats.elapsed = self.clock() - start
+        return None
+
+
+# Named strategies that flow configs can refer to.
+PRESETS = {
+    "fixed": lambda: Fixed(0.5),
+    "fast": lambda: Backoff(initial=0.25, cap=1.0),
+    "after_click": lambda: Backoff(initial=0.25, cap=2.0, fast_for=2.0),
+    "long": lambda: Backoff(initial=0.5, factor=1.2, cap=3.0),
+}
+
+STRATEGIES = {
+    "fixed": Fixed,
+    "backoff": Backoff,
+    "expected": ExpectedDuration,
+}
+
+
+def strategy_from_config(spec) -> PollStrategy:
+    """Build a strategy from a preset name or a {"type": ..., **params} dict."""
+    if spec is None:
+        return Fixed()
+    if isinstance(spec, str):
+        try:
+            return PRESETS[spec]()
+        except KeyError:
+            raise ValueError(f"Unknown polling preset: {spec} (choose from {', '.join(PRESETS)})") from None
+    params = dict(spec)
+    kind = params.pop("type", "fixed")
+    if kind not in STRATEGIES:
+        raise ValueError(f"Unknown polling strategy: {kind}")
+    return STRATEGIES[kind](**params)
@@ -0,0 +1,269 @@
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from capture import Box
+from locator import Locator
+from polling import PollStrategy
+
+# Where and what a seek bar can be, as fractions of the screen / pixels
+SEARCH_FROM = 0.7
+MIN_WIDTH = 0.4
+MIN_HEIGHT, MAX_HEIGHT = 2, 16
+FLAT = 3
+GAP = 31
+EDGE_STEP = 30
+MIN_CONTRAST = 30.0
+
+
+def _longest_run(mask: np.ndarray) -> Tuple[int, int]:
+    """Start and end (exclusive) of the longest run of True in a 1-D mask."""
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    changes = np.flatnonzero(np.diff(padded))
+    starts, ends = changes[::2], changes[1::2]
+    if not len(starts):
+        return 0, 0
+    longest = int(np.argmax(ends - starts))
+    return int(starts[longest]), int(ends[longest])
+
+
+def _close(mask: np.ndarray) -> np.ndarray:
+    """Bridge horizontal gaps of up to GAP pixels, e.g. the played/unplayed boundary or the knob."""
+    kernel = np.ones((1, GAP), np.uint8)
+    closed = cv2.morphologyEx(np.atleast_2d(mask).astype(np.uint8), cv2.MORPH_CLOSE, kernel)
+    return closed.reshape(mask.shape).astype(bool)
+
+
+def _flat_runs(gray: np.ndarray, min_run: int) -> List[Tuple[int, int, int]]:
+    """Rows that stay flat (no step to the right or down) over a long run: (row, x0, x1)."""
+    data = gray.astype(np.int16)
+    flat = _close((np.abs(np.diff(data, axis=1))[:-1] <= FLAT) & (np.abs(np.diff(data, axis=0))[:, :-1] <= FLAT))
+    rows = []
+    for y in np.flatnonzero(flat.sum(axis=1) >= min_run):
+        start, end = _longest_run(flat[y])
+        if end - start >= min_run:
+            rows.append((int(y), start, end + 1))
+    return rows
+
+
+def _outlined(image: np.ndarray, box: Box) -> np.ndarray:
+    """Columns of ``box`` where the strip differs clearly from the rows above and below it."""
+    above, below = box.top - 1, box.top + box.height
+    if above < 0 or below >= image.shape[0]:
+        return np.zeros(box.width, bool)
+    columns = slice(box.left, box.left + box.width)
+    strip = image[box.top:below, columns].astype(np.int16)
+
+    def steps(row: int, edge: np.ndarray) -> np.ndarray:
+        return np.abs(image[row, columns].astype(np.int16) - edge).max(axis=-1) >= EDGE_STEP
+
+    return _close(steps(above, strip[0]) & steps(below, strip[-1]))
+
+
+def find_progress_bar(image: np.ndarray) -> Optional[Box]:
+    """Find a video player's seek bar: a thin, wide, flat strip near the bottom of the screen.
+
+    Groups consecutive rows that are flat across at least MIN_WIDTH of the
+    screen into bands MIN_HEIGHT to MAX_HEIGHT pixels tall, trims each band
+    to where it stands out from the rows above and below, and returns the
+    widest one that still spans MIN_WIDTH.
+    """
+    height, width = image.shape[:2]
+    top = int(height * SEARCH_FROM)
+    gray = cv2.cvtColor(image[top:], cv2.COLOR_BGR2GRAY)
+    min_run = int(width * MIN_WIDTH)
+
+    bands: List[List[int]] = []  # [first row, last row, x0, x1]
+    for y, x0, x1 in _flat_runs(gray, min_run):
+        band = bands[-1] if bands else None
+        if band and y == band[1] + 1 and min(x1, band[3]) - max(x0, band[2]) >= min_run:
+            band[1], band[2], band[3] = y, max(x0, band[2]), min(x1, band[3])
+        else:
+            bands.append([y, y, x0, x1])
+
+    best = None
+    for first, last, x0, x1 in bands:
+        # The last flat row still matches the row below it
+        band_height = last - first + 2
+        if not MIN_HEIGHT <= band_height <= MAX_HEIGHT:
+            continue
+        box = Box(x0, top + first, x1 - x0, band_height)
+        start, end = _longest_run(_outlined(image, box))
+        if end - start >= min_run and (best is None or end - start > best.width):
+            best = Box(x0 + start, box.top, end - start, band_height)
+    return best
+
+
+def _split(strip: np.ndarray) -> Optional[Tuple[int, np.ndarray, np.ndarray]]:
+    """Best two-segment split of a strip along x: (split column, mean color left, mean color right)."""
+    profile = strip.reshape(strip.shape[0], strip.shape[1], -1).mean(axis=0).astype(np.float64)
+    count = profile.shape[0]
+    if count < 4:
+        return None
+    # Sum of squared errors of [0, k) and [k, count) from prefix sums, for every k
+    sums = np.cumsum(profile, axis=0)
+    squares = np.cumsum(profile ** 2, axis=0)
+    k = np.arange(1, count)
+    left_sum, left_sq = sums[:-1], squares[:-1]
+    right_sum, right_sq = sums[-1] - left_sum, squares[-1] - left_sq
+    sse = ((left_sq - left_sum ** 2 / k[:, None]).sum(axis=1)
+           + (right_sq - right_sum ** 2 / (count - k)[:, None]).sum(axis=1))
+    best = int(np.argmin(sse))
+    split = best + 1
+    return split, left_sum[best] / split, right_sum[best] / (count - split)
+
+
+def read_bar(strip: np.ndarray, min_contrast: float = MIN_CONTRAST
+             ) -> Optional[Tuple[float, np.ndarray, np.ndarray]]:
+    """Fill (0-1) and the played / unplayed colors of a seek bar strip, or None if it isn't one.
+
+    A strip whose rows differ (video showing where the controls were
+    hidden) or that has no clear played part isn't read.
+    """
+    if strip.shape[0] > 1 and np.abs(np.diff(strip.astype(np.int16), axis=0)).mean() > FLAT:
+        return None
+    split = _split(strip)
+    if split is None or np.linalg.norm(split[1] - split[2]) < min_contrast:
+        return None
+    return split[0] / strip.shape[1], split[1], split[2]
+
+
+def fill_fraction(strip: np.ndarray, min_contrast: float = MIN_CONTRAST) -> Optional[float]:
+    """How far a seek bar is filled (0-1), or None if the strip shows no clear played part."""
+    reading = read_bar(strip, min_contrast)
+    return reading[0] if reading else None
+
+
+class ProgressEstimator:
+    """Predicts when playback ends from the fill of the player's seek bar.
+
+    ``locate_bar`` finds the bar once (right after going fullscreen, giving
+    up after ``attempts`` full-screen looks); after that ``sample`` reads
+    its fill from a capture of just that strip, and ``remaining``
+    extrapolates a least-squares line through the recent samples to 100%.
+    Readings in other colors than the first one, or further back than the
+    last one, are something else drawn where the bar was and are ignored.
+    """
+
+    def __init__(self, locator: Locator, clock: Callable[[], float] = time.monotonic,
+                 region: Optional[Box] = None, history: int = 8, attempts: int = 3):
+        self.locator = locator
+        self.clock = clock
+        self.bar = region
+        self.history = history
+        self.attempts = attempts
+        self.samples: List[Tuple[float, float]] = []
+        self.colors: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def locate_bar(self) -> Optional[Box]:
+        if self.bar is None and self.attempts > 0:
+            self.attempts -= 1
+            self.bar = find_progress_bar(self.locator.capture())
+        return self.bar
+
+    def sample(self) -> Optional[float]:
+        """Read the current fill; None when the bar can't be read (e.g. controls hidden)."""
+        if self.bar is None and self.locate_bar() is None:
+            return None
+        reading = read_bar(self.locator.capture(self.bar))
+        if reading is None:
+            return None
+        fraction, played, unplayed = reading
+        if self.colors is None:
+            self.colors = played, unplayed
+        elif max(np.linalg.norm(played - self.colors[0]),
+                 np.linalg.norm(unplayed - self.colors[1])) > MIN_CONTRAST / 4:
+            return None
+        if self.samples and fraction < self.samples[-1][1] - 2 / self.bar.width:
+            return None
+        self.samples.append((self.clock(), fraction))
+        del self.samples[:-self.history]
+        return fraction
+
+    def remaining(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the bar reaches 100%, or None until the fill has been seen moving."""
+        if len(self.samples) < 2:
+            return None
+        times = np.array([t for t, _ in self.samples])
+        fractions = np.array([f for _, f in self.samples])
+        if times[-1] - times[0] <= 0:
+            return None
+        rate, offset = np.polyfit(times - times[0], fractions, 1)
+        if rate <= 0:
+            return None
+        now = self.clock() if now is None else now
+        return max((1.0 - offset) / rate - (now - times[0]), 0.0)
+
+    def uncertainty(self) -> Optional[float]:
+        """Rough error of the predicted end in seconds: each reading can be off by a pixel of the bar."""
+        moved = self.samples[-1][1] - self.samples[0][1] if self.samples else 0.0
+        remaining = self.remaining(self.samples[0][0]) if moved > 0 else None
+        if remaining is None:
+            return None
+        return remaining * 2 / (self.bar.width * moved)
+
+
+class PlaybackEnd(PollStrategy):
+    """Sleeps through most of a video and polls densely around the end the seek bar predicts.
+
+    Samples the bar every ``sample_every`` seconds (every poll until the
+    fill has been seen moving) and sleeps up to ``sparse`` seconds at a
+    time until the predicted end is near. Within ``window`` seconds of it
+    polls run every ``dense`` seconds; while the prediction is rougher than
+    that, the whole uncertain stretch, and anything past it, is polled like
+    ``fallback``. So is the rest of the wait while there is no prediction,
+    e.g. because the player hid its controls before the bar could be read
+    twice. ``on_estimate`` gets the seconds left after every sample, or None.
+    """
+
+    def __init__(self, estimator: ProgressEstimator, fallback: PollStrategy, sample_every: float = 30.0,
+                 dense: float = 0.25, sparse: float = 10.0, window: float = 5.0,
+                 on_estimate: Optional[Callable[[Optional[float]], None]] = None):
+        self.estimator = estimator
+        self.fallback = fallback
+        self.sample_every = sample_every
+        self.dense = dense
+        self.sparse = min(sparse, sample_every)
+        self.window = window
+        self.on_estimate = on_estimate
+        self.expected: Optional[float] = None
+        self.error = 0.0
+        self._sampled_at: Optional[float] = None
+
+    def reset(self) -> None:
+        self.fallback.reset()
+        self.estimator.samples.clear()
+        self.expected = None
+        self._sampled_at = None
+
+    def _sample(self, elapsed: float) -> None:
+        self._sampled_at = elapsed
+        self.estimator.sample()
+        remaining = self.estimator.remaining()
+        error = self.estimator.uncertainty() if remaining is not None else None
+        # A fit that slopes up while the fill hasn't moved (paused, or a
+        # pixel of jitter) has no usable error either: treat it as no estimate
+        if error is None:
+            remaining = None
+            self.expected = None
+        else:
+            self.expected = elapsed + remaining
+            self.error = error
+        if self.on_estimate is not None:
+            self.on_estimate(remaining)
+
+    def next_interval(self, elapsed: float) -> float:
+        moving = len(self.estimator.samples) >= 2
+        if self._sampled_at is None or not moving or elapsed - self._sampled_at >= self.sample_every:
+            self._sample(elapsed)
+        if self.expected is None:
+            return self.fallback.next_interval(elapsed)
+        margin = max(self.window, self.error)
+        remaining = self.expected - elapsed
+        if remaining > margin:
+            return max(self.dense, min(self.sparse, remaining - margin))
+        if self.error <= self.window and remaining > -self.window:
+            return self.dense
+        return self.fallback.next_interval(elapsed)
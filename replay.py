@@ -0,0 +1,410 @@
+"""Record what a live run sees and does, and replay it offline.
+
+A recording is a directory::
+
+    session.json     screen size and origin, flow, when it was made
+    flow.json        the flow as the run used it, command-line overrides included
+    positions.json   the remembered regions and UI scale the run started with
+    frames.jsonl     one line per stored frame: a full keyframe or a patch
+    timeline.jsonl   every grab (which frame was on screen) and every input, timestamped
+    frames/          the PNG files
+
+Only frames that differ from the previous one are stored, and then only
+the bounding box of the changed pixels, with a full keyframe every
+``keyframe_every`` frames or when most of the screen changed. Encoding
+runs on a background thread.
+
+Replaying feeds the recorded frames back through the engine on a virtual
+clock: sleeps return immediately and advance the clock, and each grab
+returns the next recorded frame (or, with --timed, the frame that was on
+screen at the clock's time). The engine starts from the recorded flow and
+positions, so it searches the same regions the live run did. A run is
+deterministic and as fast as matching allows; the inputs the engine makes
+are compared with the recorded ones.
+
+    python cli.py --record recordings/run1 ...      record a live run
+    python replay.py recordings/run1 [--json]       replay it headless
+"""
+import argparse
+import bisect
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from capture import Box, CaptureBackend, crop
+from inputs import InputBackend, StubInput
+
+if TYPE_CHECKING:
+    from flow import Flow
+    from locator import RegionMemory
+
+_STOP = object()
+
+
+class Recorder:
+    """Writes frames and input events to a recording directory from a background thread."""
+
+    def __init__(self, path: str, keyframe_every: int = 50, max_patch: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.keyframe_every = keyframe_every
+        self.max_patch = max_patch
+        self.clock = clock
+        self.frames_stored = 0
+        self.grabs = 0
+        self._start = clock()
+        self._last: Optional[np.ndarray] = None
+        self._frame_id = -1
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        os.makedirs(os.path.join(path, "frames"), exist_ok=True)
+        self._frames_file = open(os.path.join(path, "frames.jsonl"), "w", encoding="utf-8")
+        self._timeline_file = open(os.path.join(path, "timeline.jsonl"), "w", encoding="utf-8")
+        self._previous: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def _now(self) -> float:
+        return round(self.clock() - self._start, 4)
+
+    def write_session(self, **fields: Any) -> None:
+        fields.setdefault("recorded", time.strftime("%Y-%m-%d %H:%M:%S"))
+        with open(os.path.join(self.path, "session.json"), "w", encoding="utf-8") as f:
+            json.dump(fields, f, indent=2)
+
+    def write_snapshot(self, flow: "Flow", memory: "RegionMemory") -> None:
+        """Store the effective flow and the remembered positions a run starts from."""
+        with open(os.path.join(self.path, "flow.json"), "w", encoding="utf-8") as f:
+            json.dump(flow.to_dict(), f, indent=2)
+        with open(os.path.join(self.path, "positions.json"), "w", encoding="utf-8") as f:
+            json.dump(memory.to_dict(), f, indent=2)
+
+    def frame(self, image: np.ndarray) -> None:
+        """Log one full-screen grab; the image is only copied when it changed."""
+        self.grabs += 1
+        if self._last is None or self._last.shape != image.shape or not np.array_equal(self._last, image):
+            self._last = image.copy()
+            self._frame_id += 1
+            self._queue.put(("frame", self._frame_id, self._last))
+        self._queue.put(("timeline", {"t": self._now(), "frame": self._frame_id}))
+
+    def input(self, kind: str, *args: Any) -> None:
+        self._queue.put(("timeline", {"t": self._now(), "input": kind, "args": list(args)}))
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._frames_file.close()
+        self._timeline_file.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if item[0] == "timeline":
+                self._timeline_file.write(json.dumps(item[1]) + "\n")
+            else:
+                self._store(item[1], item[2])
+
+    def _store(self, frame_id: int, image: np.ndarray) -> None:
+        entry: Dict[str, Any] = {"id": frame_id}
+        patch = None
+        if self._previous is not None and self._previous.shape == image.shape \
+                and self._since_keyframe < self.keyframe_every:
+            changed = cv2.absdiff(self._previous, image).max(axis=2)
+            x, y, w, h = cv2.boundingRect(cv2.findNonZero(changed))
+            if w * h <= self.max_patch * image.shape[0] * image.shape[1]:
+                patch = (x, y, w, h)
+        if patch is None:
+            name, data = f"{frame_id:06d}.png", image
+            self._since_keyframe = 0
+        else:
+            x, y, w, h = patch
+            name, data = f"{frame_id:06d}-patch.png", image[y:y + h, x:x + w]
+            entry.update(base=frame_id - 1, x=x, y=y)
+            self._since_keyframe += 1
+        cv2.imwrite(os.path.join(self.path, "frames", name), data)
+        entry["file"] = name
+        self._frames_file.write(json.dumps(entry) + "\n")
+        self._previous = image
+        self.frames_stored += 1
+
+
+class RecordingCapture(CaptureBackend):
+    """Passes grabs through to a live backend and records them.
+
+    Region grabs are served from a full-screen grab so the recording always
+    has the whole screen; recording therefore costs a full capture per poll.
+    """
+
+    def __init__(self, inner: CaptureBackend, recorder: Recorder):
+        self.inner = inner
+        self.recorder = recorder
+        self.name = f"{inner.name}+record"
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        return self.inner.origin
+
+    def grab(self, region: Optional[Box] = None) -> np.ndarray:
+        frame = self.inner.grab()
+        self.recorder.frame(frame)
+        return crop(frame, region)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class RecordingInput(InputBackend):
+    """Wraps a live input backend and logs every action to a Recorder."""
+
+    def __init__(self, inner: InputBackend, recorder: Recorder):
+        self.inner = inner
+        self.recorder = recorder
+        self.name = inner.name
+
+    def move(self, x: float, y: float) -> None:
+        self.recorder.input("move", x, y)
+        self.inner.move(x, y)
+
+    def click(self, x: float, y: float) -> None:
+        self.recorder.input("click", x, y)
+        self.inner.click(x, y)
+
+    def press(self, key: str) -> None:
+        self.recorder.input("press", key)
+        self.inner.press(key)
+
+    def flush(self) -> None:
+        self.inner.flush()
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class Recording:
+    """A recording directory loaded for replay; frames are rebuilt on demand."""
+
+    def __init__(self, path: str, cache: int = 8):
+        self.path = path
+        with open(os.path.join(path, "session.json"), encoding="utf-8") as f:
+            self.session: Dict[str, Any] = json.load(f)
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        with open(os.path.join(path, "frames.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self.entries[entry["id"]] = entry
+        self.grabs: List[Tuple[float, int]] = []
+        self.inputs: List[Dict[str, Any]] = []
+        with open(os.path.join(path, "timeline.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                if "frame" in item:
+                    self.grabs.append((item["t"], item["frame"]))
+                else:
+                    self.inputs.append(item)
+        if not self.grabs:
+            raise ValueError(f"Recording has no frames: {path}")
+        self.times = [t for t, _ in self.grabs]
+        self.duration = self.times[-1]
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cache_size = cache
+
+    def frame(self, frame_id: int) -> np.ndarray:
+        cached = self._cache.get(frame_id)
+        if cached is not None:
+            self._cache.move_to_end(frame_id)
+            return cached
+        entry = self.entries[frame_id]
+        image = cv2.imread(os.path.join(self.path, "frames", entry["file"]), cv2.IMREAD_COLOR)
+        if image is None:
+            raise FileNotFoundError(f"Could not decode frame: {entry['file']}")
+        if "base" in entry:
+            patch = image
+            image = self.frame(entry["base"]).copy()
+            x, y = entry["x"], entry["y"]
+            image[y:y + patch.shape[0], x:x + patch.shape[1]] = patch
+        self._cache[frame_id] = image
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return image
+
+    def frame_at(self, t: float) -> np.ndarray:
+        """The frame that was on screen ``t`` seconds into the recording."""
+        index = max(bisect.bisect_right(self.times, t) - 1, 0)
+        return self.frame(self.grabs[index][1])
+
+
+class VirtualClock:
+    """A clock that only moves when something sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += max(seconds, 0.0)
+
+
+class ReplayCapture(CaptureBackend):
+    """Serves a recording's frames to the locator.
+
+    In lockstep mode (the default) the n-th grab returns the frame of the
+    n-th recorded grab and moves ``clock`` forward to when it was taken, so
+    an unchanged engine sees exactly what the live run saw, time included.
+    Otherwise each grab returns whatever was on screen at ``clock``'s time.
+    """
+
+    name = "replay"
+
+    def __init__(self, recording: Recording, clock: VirtualClock, lockstep: bool = True):
+        self.recording = recording
+        self.clock = clock
+        self.lockstep = lockstep
+        self.grabs = 0
+        self.origin = tuple(recording.session.get("origin", (0, 0)))
+
+    @property
+    def finished(self) -> bool:
+        if self.lockstep:
+            return self.grabs >= len(self.recording.grabs)
+        return self.clock.monotonic() > self.recording.duration
+
+    def grab(self, region: Optional[Box] = None) -> np.ndarray:
+        if self.lockstep:
+            t, frame_id = self.recording.grabs[min(self.grabs, len(self.recording.grabs) - 1)]
+            self.clock.now = max(self.clock.now, t)
+            frame = self.recording.frame(frame_id)
+        else:
+            frame = self.recording.frame_at(self.clock.monotonic())
+        self.grabs += 1
+        return crop(frame, region)
+
+
+def compare_inputs(recorded: List[Dict[str, Any]], replayed: List[Dict[str, Any]],
+                   tolerance: float = 5.0) -> List[str]:
+    """Differences between two input sequences; clicks match within ``tolerance`` pixels."""
+    problems = []
+    for index, (want, got) in enumerate(zip(recorded, replayed)):
+        if want["input"] != got["input"]:
+            problems.append(f"input {index}: recorded {want['input']}, replayed {got['input']}")
+        elif want["input"] == "click":
+            dx, dy = (a - b for a, b in zip(want["args"], got["args"]))
+            if max(abs(dx), abs(dy)) > tolerance:
+                problems.append(f"input {index}: click at {want['args']} replayed at {got['args']}")
+        elif want["args"] != got["args"]:
+            problems.append(f"input {index}: recorded {want['args']}, replayed {got['args']}")
+    if len(recorded) != len(replayed):
+        problems.append(f"recorded {len(recorded)} inputs, replayed {len(replayed)}")
+    return problems
+
+
+def replay(path: str, flow_path: Optional[str] = None, templates_dir: str = "", lockstep: bool = True,
+           log: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    """Run the engine over a recording and report how it went.
+
+    Uses the recording's flow snapshot and templates directory unless
+    ``flow_path`` / ``templates_dir`` are given, and starts from its
+    remembered positions.
+    """
+    from engine import Engine
+    from events import EventLog
+    from locator import RegionMemory
+    from templates import TemplateRegistry
+
+    recording = Recording(path)
+    clock = VirtualClock()
+    backend = ReplayCapture(recording, clock, lockstep)
+    inputs = StubInput(clock.monotonic)
+    engine: Optional[Engine] = None
+
+    def sleep(seconds: float) -> None:
+        clock.sleep(seconds)
+        if backend.finished and engine is not None:
+            engine.stop()
+
+    snapshot = os.path.join(path, "flow.json")
+    if flow_path is None:
+        flow_path = snapshot if os.path.exists(snapshot) else recording.session.get("flow")
+    # Start from the live run's positions without writing back to the recording
+    memory = RegionMemory(path=None)
+    memory.load(os.path.join(path, "positions.json"))
+
+    engine = Engine(flow_path,
+                    log=log or (lambda message, level="INFO": None),
+                    templates=TemplateRegistry(templates_dir or recording.session.get("templates", "")),
+                    events=EventLog(os.path.join(path, "replay-events.jsonl")).start(),
+                    backend=backend, workers=1, memory=memory,
+                    input_backend=inputs,
+                    clock=clock.monotonic, sleep=sleep,
+                    start_delay=recording.session.get("start_delay", 5.0))
+    if not engine.load_flow():
+        engine.close()
+        raise ValueError(f"Could not load flow for replay of {path}")
+    engine.load_templates()
+
+    start = time.perf_counter()
+    engine.run(recording.session.get("cycles"))
+    wall = time.perf_counter() - start
+    engine.close()
+
+    successes = sum(counter["value"] for counter in engine.metrics.snapshot()["counters"]
+                    if counter["name"] == "cycles" and counter["labels"].get("result") == "success")
+    return {
+        "recording": path,
+        "cycles": engine.cycle_count,
+        "successes": successes,
+        "none_videos": engine.none_video_count,
+        "grabs": backend.grabs,
+        "recorded_seconds": recording.duration,
+        "wall_seconds": round(wall, 3),
+        "speedup": round(recording.duration / wall, 1) if wall > 0 else None,
+        "grabs_per_second": round(backend.grabs / wall, 1) if wall > 0 else None,
+        "inputs": inputs.actions,
+        "mismatches": compare_inputs(recording.inputs, inputs.actions),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded run through the automation engine")
+    parser.add_argument("recording", help="recording directory (made with cli.py --record)")
+    parser.add_argument("--flow", help="flow to replay with (default: the one recorded)")
+    parser.add_argument("--templates", default="", metavar="DIR",
+                        help="template image directory (default: the one recorded)")
+    parser.add_argument("--timed", action="store_true",
+                        help="serve frames by virtual time instead of grab by grab "
+                             "(tolerates a different number of polls, at the cost of timing drift)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="print the engine log")
+    args = parser.parse_args(argv)
+
+    from engine import print_log
+    report = replay(args.recording, args.flow, args.templates, lockstep=not args.timed,
+                    log=print_log if args.verbose else None)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['cycles']} cycles ({report['successes']} succeeded, {report['none_videos']} none videos), "
+              f"{report['grabs']} grabs")
+        print(f"{report['recorded_seconds']:.1f}s recorded replayed in {report['wall_seconds']:.2f}s "
+              f"({report['speedup']}x, {report['grabs_per_second']} grabs/s)")
+        for problem in report["mismatches"]:
+            print(f"MISMATCH {problem}")
+        if not report["mismatches"]:
+            print(f"All {len(report['inputs'])} inputs match the recording")
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Run several automation sessions side by side, each on its own X display.
+
+    python supervisor.py flows/video.json --sessions 4 --launch "firefox --kiosk https://..."
+
+Every session gets a virtual display (Xvfb :99, :100, ...; --no-xvfb uses
+displays that are already running), an optional program started on it
+(--launch), and a child process with its own capture backend, input
+backend, engine and flow. Children run one matching thread each, so the
+number of sessions one machine can keep up with grows with its cores.
+
+The supervisor collects every session's counters into one view: a status
+line every --status-every seconds, Prometheus metrics labelled by session
+(--metrics-port) and a JSON summary on exit. Each session logs to
+logs/sessions/<n>/ (events, remembered positions, stats).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from exporter import add_arguments, serve
+from flow import DEFAULT_FLOW
+from metrics import Metrics
+
+SESSIONS_DIR = os.path.join("logs", "sessions")
+
+
+def start_display(number: int, size: str = "1920x1080", timeout: float = 10.0) -> subprocess.Popen:
+    """Start Xvfb on display :number and wait until it accepts connections.
+
+    Refuses a display that is already in use (its socket or lock file
+    exists), so a session never ends up on someone else's screen.
+    """
+    socket, lock = f"/tmp/.X11-unix/X{number}", f"/tmp/.X{number}-lock"
+    if os.path.exists(socket) or os.path.exists(lock):
+        raise RuntimeError(f"Display :{number} is already in use; pick another --display-base")
+    process = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", f"{size}x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket):
+        if process.poll() is not None:
+            break
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError(f"Xvfb :{number} did not start within {timeout:g}s")
+        time.sleep(0.05)
+    if process.poll() is not None:
+        raise RuntimeError(f"Xvfb :{number} exited with code {process.returncode}")
+    return process
+
+
+def counts(counters: List[Tuple[str, Dict[str, str], float]]) -> Dict[str, float]:
+    """Cycle and none-video totals from one session's counters."""
+    totals = {"cycles": 0.0, "successes": 0.0, "none_videos": 0.0}
+    for name, labels, value in counters:
+        if name == "cycles":
+            totals["cycles"] += value
+            if labels.get("result") == "success":
+                totals["successes"] += value
+        elif name == "flow_events" and labels.get("event") == "none_video":
+            totals["none_videos"] += value
+    return totals
+
+
+def run_session(index: int, display: str, options: Dict[str, Any], updates: Any) -> None:
+    """Body of one session's child process: an engine on ``display`` reporting to ``updates``.
+
+    Each report is (session, counters as Metrics.collect() gives them, finished).
+    """
+    os.environ["DISPLAY"] = display
+    import cv2
+    from capture import create_backend
+    from engine import Engine
+    from events import EventLog
+    from inputs import create_input
+    from locator import RegionMemory
+    from templates import TemplateRegistry
+
+    # One matching thread per session; the sessions are the parallelism
+    cv2.setNumThreads(1)
+    directory = os.path.join(SESSIONS_DIR, str(index))
+    os.makedirs(directory, exist_ok=True)
+    prefix = f"[session {index}]"
+
+    def log(message: str, level: str = "INFO") -> None:
+        print(f"[{time.strftime('%H:%M:%S')}] [{level}] {prefix} {message}", flush=True)
+
+    engine: Optional[Engine] = None
+
+    def report(finished: bool = False) -> None:
+        if engine is not None:
+            updates.put((index, engine.metrics.collect()[0], finished))
+
+    engine = Engine(options["flow"], log=log, on_update=report, workers=1,
+                    templates=TemplateRegistry(options["templates"]),
+                    events=EventLog(os.path.join(directory, "events.jsonl")).start(),
+                    memory=RegionMemory(os.path.join(directory, "positions.json")),
+                    backend=create_backend(options["capture"]), input_backend=create_input(options["input"]),
+                    start_delay=options["start_delay"])
+    signal.signal(signal.SIGTERM, lambda signum, frame: engine.stop())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        if engine.load_flow():
+            engine.load_templates()
+            engine.run(options["cycles"])
+    finally:
+        engine.save()
+        engine.metrics.export(os.path.join(directory, "stats.json"))
+        engine.close()
+        report(finished=True)
+
+
+class Supervisor:
+    """Starts N sessions and aggregates what they report.
+
+    ``metrics`` holds every session's counters labelled with session=<n>;
+    ``sessions`` the latest per-session totals (see counts).
+    """
+
+    def __init__(self, sessions: int, options: Dict[str, Any], display_base: int = 99,
+                 xvfb: bool = True, screen: str = "1920x1080", launch: Optional[str] = None,
+                 target: Callable[..., None] = run_session,
+                 log: Optional[Callable[[str, str], None]] = None):
+        self.count = sessions
+        self.options = options
+        self.display_base = display_base
+        self.xvfb = xvfb
+        self.screen = screen
+        self.launch = launch
+        self.target = target
+        self.log = log or (lambda message, level="INFO": print(
+            f"[{time.strftime('%H:%M:%S')}] [{level}] {message}", flush=True))
+        self.metrics = Metrics()
+        self.sessions: Dict[int, Dict[str, Any]] = {}
+        self.started = time.monotonic()
+        self._context = multiprocessing.get_context("spawn")
+        self._updates = self._context.Queue()
+        self._processes: Dict[int, Any] = {}
+        self._helpers: List[subprocess.Popen] = []
+        self._last: Dict[int, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]] = {}
+
+    def start(self) -> "Supervisor":
+        for index in range(self.count):
+            number = self.display_base + index
+            display = f":{number}"
+            if self.xvfb:
+                self._helpers.append(start_display(number, self.screen))
+            if self.launch:
+                env = dict(os.environ, DISPLAY=display)
+                self._helpers.append(subprocess.Popen(shlex.split(self.launch), env=env,
+                                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            process = self._context.Process(target=self.target, args=(index, display, self.options, self._updates),
+                                            name=f"session-{index}", daemon=False)
+            process.start()
+            self._processes[index] = process
+            self.sessions[index] = {"display": display, "pid": process.pid, "running": True,
+                                    "cycles": 0.0, "successes": 0.0, "none_videos": 0.0}
+            self.log(f"Session {index} started on display {display} (pid {process.pid})", "INFO")
+        return self
+
+    def _apply(self, index: int, counters: List[Tuple[str, Dict[str, str], float]], finished: bool) -> None:
+        last = self._last.setdefault(index, {})
+        for name, labels, value in counters:
+            key = (name, tuple(sorted(labels.items())))
+            delta = value - last.get(key, 0.0)
+            if delta:
+                self.metrics.inc(name, delta, session=index, **labels)
+            last[key] = value
+        self.sessions[index].update(counts(counters))
+        if finished:
+            self.sessions[index]["running"] = False
+
+    def poll(self, timeout: float = 1.0) -> None:
+        """Take in the sessions' reports for up to ``timeout`` seconds and note exited children."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                index, counters, finished = self._updates.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                break
+            self._apply(index, counters, finished)
+        for index, process in self._processes.items():
+            session = self.sessions[index]
+            if session["running"] and not process.is_alive():
+                session["running"] = False
+                session["exit_code"] = process.exitcode
+                level = "INFO" if process.exitcode == 0 else "ERROR"
+                self.log(f"Session {index} exited with code {process.exitcode}", level)
+
+    @property
+    def running(self) -> int:
+        return sum(session["running"] for session in self.sessions.values())
+
+    def totals(self) -> Dict[str, float]:
+        totals = {key: sum(session[key] for session in self.sessions.values())
+                  for key in ("cycles", "successes", "none_videos")}
+        hours = (time.monotonic() - self.started) / 3600
+        totals["cycles_per_hour"] = totals["cycles"] / hours if hours > 0 else 0.0
+        return totals
+
+    def status(self) -> str:
+        totals = self.totals()
+        per_session = " ".join(f"{index}:{int(session['cycles'])}" for index, session in self.sessions.items())
+        return (f"{self.running}/{len(self.sessions)} sessions running | cycles {int(totals['cycles'])} "
+                f"({int(totals['successes'])} ok) | none videos {int(totals['none_videos'])} | "
+                f"{totals['cycles_per_hour']:.1f} cycles/h | per session {per_session}")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Ask every session to finish its current wait and exit, then shut the displays down."""
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(deadline - time.monotonic(), 0.0))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self.poll(timeout=0.5)
+        for helper in reversed(self._helpers):
+            helper.terminate()
+            try:
+                helper.wait(5)
+            except subprocess.TimeoutExpired:
+                helper.kill()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"sessions": {str(index): session for index, session in self.sessions.items()},
+                "totals": self.totals(), "seconds": round(time.monotonic() - self.started, 1)}
+
+
+def interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run several automation sessions on separate X displays")
+    parser.add_argument("flow", nargs="?", default=DEFAULT_FLOW, help="flow definition (JSON)")
+    parser.add_argument("--sessions", type=int, default=os.cpu_count() or 1,
+                        help="number of parallel sessions (default: one per core)")
+    parser.add_argument("--display-base", type=int, default=99, help="first display number (:99)")
+    parser.add_argument("--no-xvfb", action="store_true", help="use displays that are already running")
+    parser.add_argument("--screen", default="1920x1080", help="Xvfb screen size")
+    parser.add_argument("--launch", metavar="COMMAND", help="program to start on every display, e.g. a browser")
+    parser.add_argument("--templates", default="", metavar="DIR", help="directory holding the template images")
+    parser.add_argument("--cycles", type=int, help="stop each session after this many cycles")
+    parser.add_argument("--start-delay", type=float, default=5.0,
+                        help="seconds each session waits before its first cycle")
+    parser.add_argument("--capture", default="auto", help="screen capture backend for the sessions")
+    parser.add_argument("--input", default="auto", help="input backend for the sessions")
+    parser.add_argument("--status-every", type=float, default=10.0, help="seconds between status lines")
+    add_arguments(parser, "the sessions' metrics")
+    parser.add_argument("--summary", metavar="PATH", help="write the aggregated counters here on exit")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, target: Callable[..., None] = run_session) -> int:
+    args = build_parser().parse_args(argv)
+    options = {"flow": args.flow, "templates": args.templates, "cycles": args.cycles,
+               "start_delay": args.start_delay, "capture": args.capture, "input": args.input}
+    supervisor = Supervisor(args.sessions, options, args.display_base, xvfb=not args.no_xvfb,
+                            screen=args.screen, launch=args.launch, target=target)
+    server = None
+    if args.metrics_port is not None:
+        server = serve(supervisor.metrics, args.metrics_host, args.metrics_port, supervisor.log)
+
+    # SIGTERM stops the sessions the same way Ctrl+C does
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        supervisor.start()
+        next_status = time.monotonic() + args.status_every
+        while supervisor.running:
+            supervisor.poll()
+            if time.monotonic() >= next_status:
+                supervisor.log(supervisor.status(), "INFO")
+                next_status += args.status_every
+    except KeyboardInterrupt:
+        supervisor.log("Stopping all sessions...", "INFO")
+    except RuntimeError as e:
+        supervisor.log(str(e), "ERROR")
+    finally:
+        supervisor.stop()
+        if server is not None:
+            server.close()
+    supervisor.log(supervisor.status(), "INFO")
+    if args.summary:
+        directory = os.path.dirname(args.summary)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(supervisor.summary(), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
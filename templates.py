@@ -0,0 +1,155 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# Every template the automation flow looks for.
+TEMPLATE_NAMES = ('play.png', 'fullscreen.png', 'out.png', 'next1.png', 'next2.png')
+
+# How a template and the screen are preprocessed before matching:
+#   color    all three BGR channels (the default)
+#   gray     luminance only, a third of the work of color
+#   channel  the single BGR channel with the most contrast in the template
+#   edges    a blurred Canny edge map, for buttons recognisable by outline alone
+PROFILES = ('color', 'gray', 'channel', 'edges')
+
+
+@dataclass
+class Template:
+    """A decoded template image kept in memory between polls."""
+    name: str
+    path: str
+    color: np.ndarray
+    width: int
+    height: int
+    mtime: float
+    file_size: int
+    profile: str = 'color'
+    channel: int = 0
+    # The color image preprocessed for ``profile``; what actually gets matched
+    image: np.ndarray = field(default=None, repr=False)
+    # Derived data (scaled copies etc.), dropped together with the template on reload
+    variants: Dict[Any, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def view(self) -> Tuple[str, int]:
+        """Identifies the preprocessing, so a frame can be converted once for all templates sharing it."""
+        return self.profile, self.channel if self.profile == 'channel' else 0
+
+
+def preprocess(image: np.ndarray, view: Tuple[str, int]) -> np.ndarray:
+    """Convert a BGR image for matching under a (profile, channel) view."""
+    profile, channel = view
+    if profile == 'color':
+        return image
+    if profile == 'gray':
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if profile == 'channel':
+        return cv2.extractChannel(image, channel)
+    if profile == 'edges':
+        edges = cv2.Canny(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 50, 150)
+        # Thin edges only line up with exact placements; blurring them
+        # keeps the score smooth around the true position
+        return cv2.GaussianBlur(edges, (5, 5), 0)
+    raise ValueError(f"Unknown matching profile: {profile}")
+
+
+def _build_template(name: str, path: str, color: np.ndarray, mtime: float, file_size: int,
+                    profile: str = 'color') -> Template:
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown matching profile: {profile}")
+    height, width = color.shape[:2]
+    channel = int(np.argmax([float(np.std(color[:, :, c])) for c in range(3)]))
+    template = Template(
+        name=name,
+        path=path,
+        color=color,
+        width=width,
+        height=height,
+        mtime=mtime,
+        file_size=file_size,
+        profile=profile,
+        channel=channel,
+    )
+    template.image = preprocess(color, template.view)
+    return template
+
+
+def load_template(name: str, path: str, profile: str = 'color') -> Template:
+    """Read and decode a template image from disk and prepare it for ``profile``."""
+    stat = os.stat(path)
+    color = cv2.imread(path, cv2.IMREAD_COLOR)
+    if color is None:
+        raise FileNotFoundError(f"Could not decode template image: {path}")
+    return _build_template(name, path, color, stat.st_mtime, stat.st_size, profile)
+
+
+def rescaled(template: Template, factor: float) -> Template:
+    """The template resized by ``factor`` (e.g. for 125% DPI), cached on the original."""
+    if factor == 1.0:
+        return template
+    key = ("rescaled", factor)
+    cached = template.variants.get(key)
+    if cached is None:
+        interpolation = cv2.INTER_AREA if factor < 1.0 else cv2.INTER_CUBIC
+        color = cv2.resize(template.color, None, fx=factor, fy=factor, interpolation=interpolation)
+        cached = _build_template(template.name, template.path, color, template.mtime, template.file_size,
+                                 template.profile)
+        template.variants[key] = cached
+    return cached
+
+
+class TemplateRegistry:
+    """Loads template images once and hands out the decoded arrays.
+
+    Entries are reloaded when the file on disk changes (mtime or size), so
+    swapping a PNG while the automation is running takes effect on the next poll.
+    ``profiles`` maps template names to a matching profile (see PROFILES);
+    the rest use ``default_profile``. Changing either reloads the template.
+    """
+
+    def __init__(self, base_dir: str = "", names: Iterable[str] = TEMPLATE_NAMES,
+                 profiles: Optional[Dict[str, str]] = None, default_profile: str = 'color'):
+        self.base_dir = base_dir
+        self.names = tuple(names)
+        self.profiles: Dict[str, str] = dict(profiles or {})
+        self.default_profile = default_profile
+        self._templates: Dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.base_dir, name)
+
+    def profile_for(self, name: str) -> str:
+        return self.profiles.get(name, self.default_profile)
+
+    def preload(self) -> List[str]:
+        """Load every known template. Returns the names that failed to load."""
+        missing = []
+        for name in self.names:
+            try:
+                self.get(name)
+            except OSError:
+                missing.append(name)
+        return missing
+
+    def get(self, name: str) -> Template:
+        """Return the decoded template, reloading it if the file has changed."""
+        path = self.path_for(name)
+        profile = self.profile_for(name)
+        stat = os.stat(path)
+        with self._lock:
+            template = self._templates.get(name)
+            if (template is None or template.mtime != stat.st_mtime
+                    or template.file_size != stat.st_size or template.profile != profile):
+                template = load_template(name, path, profile)
+                self._templates[name] = template
+            return template
@@ -0,0 +1,70 @@
+import os
+
+from bench.synth import make_screen
+from capture import CaptureBackend, FileCapture
+from change import wait_for_settle
+from engine import Engine
+from events import EventLog
+from inputs import StubInput
+from locator import Locator, RegionMemory
+from replay import VirtualClock
+from templates import TemplateRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def clicked_play():
+    """A locator whose screen shows the play button once, then the same screen without it."""
+    templates = TemplateRegistry(ROOT)
+    without_play, _ = make_screen(1280, 720, templates, [])
+    with_play, placed = make_screen(1280, 720, templates, ["play.png"], background=without_play)
+    locator = Locator(templates, backend=FileCapture([with_play, without_play]))
+    return locator, placed["play.png"]
+
+
+def test_button_sized_change_settles_over_the_whole_screen():
+    locator, _ = clicked_play()
+    clock = VirtualClock()
+    result = wait_for_settle(locator, max_wait=5.0, clock=clock.monotonic, sleep=clock.sleep)
+    assert result.changed and result.settled
+    assert result.elapsed < 1.0
+
+
+def test_change_settles_around_the_clicked_button():
+    locator, box = clicked_play()
+    clock = VirtualClock()
+    result = wait_for_settle(locator, region=locator.around(box), max_wait=5.0,
+                             clock=clock.monotonic, sleep=clock.sleep)
+    assert result.changed and result.settled
+    assert result.elapsed < 1.0
+
+
+def test_still_screen_waits_to_the_limit():
+    templates = TemplateRegistry(ROOT)
+    screen, _ = make_screen(1280, 720, templates, [])
+    clock = VirtualClock()
+    result = wait_for_settle(Locator(templates, backend=FileCapture([screen])), max_wait=2.0,
+                             clock=clock.monotonic, sleep=clock.sleep)
+    assert not result.changed and not result.settled
+    assert result.elapsed >= 2.0
+
+
+class LockedScreen(CaptureBackend):
+    """Capture that fails the way it does while the workstation is locked."""
+
+    def grab(self, region=None):
+        raise OSError("screen grab failed")
+
+
+def test_pause_sleeps_when_the_screen_cannot_be_captured(tmp_path):
+    clock = VirtualClock()
+    logged = []
+    engine = Engine(log=lambda message, level="INFO": logged.append(level),
+                    events=EventLog(str(tmp_path / "events.jsonl")).start(),
+                    backend=LockedScreen(), input_backend=StubInput(clock.monotonic), workers=1,
+                    memory=RegionMemory(None), clock=clock.monotonic, sleep=clock.sleep)
+    engine.is_running = True
+    engine.pause(5.0)
+    engine.close()
+    assert clock.now == 5.0
+    assert logged == ["WARNING"]
@@ -0,0 +1,47 @@
+import json
+import os
+
+from events import EventLog
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_events_are_written_as_json_lines(tmp_path):
+    path = str(tmp_path / "logs" / "events.jsonl")
+    log = EventLog(path, flush_interval=0.01).start()
+    for i in range(100):
+        log.emit("wait", cycle=i, box=[1, 2, 3, 4])
+    log.close()
+    events = read(path)
+    assert [event["cycle"] for event in events] == list(range(100))
+    assert events[0]["event"] == "wait"
+    assert events[0]["box"] == [1, 2, 3, 4]
+    assert "ts" in events[0]
+    assert log.dropped == 0
+
+
+def test_rotation_keeps_the_newest_backups(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    log = EventLog(path, max_bytes=1, backups=2, rotate_every=None, flush_interval=0.01)
+    for i in range(5):
+        # One batch per writer run, so every write after the first finds the file full
+        log.start()
+        log.emit("cycle_end", cycle=i)
+        log.close()
+    assert [event["cycle"] for event in read(path)] == [4]
+    assert [event["cycle"] for event in read(path + ".1")] == [3]
+    assert [event["cycle"] for event in read(path + ".2")] == [2]
+    assert not os.path.exists(path + ".3")
+
+
+def test_rotation_by_age(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    log = EventLog(path, rotate_every=0.0)
+    log._write([{"event": "a"}])
+    log._write([{"event": "b"}])
+    log._file.close()
+    assert [event["event"] for event in read(path)] == ["b"]
+    assert [event["event"] for event in read(path + ".1")] == ["a"]
@@ -0,0 +1,58 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from exporter import CONTENT_TYPE, MetricsServer, render, serve
+from metrics import Metrics
+
+
+def sample_metrics():
+    metrics = Metrics()
+    metrics.inc("cycles", result="success")
+    metrics.inc("cycles", 2, result="failure")
+    metrics.inc("wait_timeouts", target='next1.png / "next2"')
+    metrics.observe("match_seconds", 0.003)
+    metrics.observe("match_seconds", 0.02)
+    metrics.observe("wait_polls", 7)
+    return metrics
+
+
+def test_render_counters_and_histograms():
+    lines = render(sample_metrics()).splitlines()
+    assert lines.count("# TYPE autorun_cycles_total counter") == 1
+    assert 'autorun_cycles_total{result="success"} 1' in lines
+    assert 'autorun_cycles_total{result="failure"} 2' in lines
+    assert 'autorun_wait_timeouts_total{target="next1.png / \\"next2\\""} 1' in lines
+    assert "# TYPE autorun_match_seconds histogram" in lines
+    assert 'autorun_match_seconds_bucket{le="0.001"} 0' in lines
+    assert 'autorun_match_seconds_bucket{le="0.005"} 1' in lines
+    assert 'autorun_match_seconds_bucket{le="0.025"} 2' in lines
+    assert 'autorun_match_seconds_bucket{le="+Inf"} 2' in lines
+    assert "autorun_match_seconds_count 2" in lines
+    # Count histograms get count buckets
+    assert 'autorun_wait_polls_bucket{le="10.0"} 1' in lines
+    assert any(line.startswith("autorun_uptime_seconds ") for line in lines)
+
+
+def test_server_on_a_free_port():
+    server = MetricsServer(sample_metrics(), port=0).start()
+    try:
+        assert server.port != 0
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert 'autorun_cycles_total{result="success"} 1' in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://{server.host}:{server.port}/other", timeout=5)
+    finally:
+        server.close()
+
+
+def test_serve_carries_on_when_the_port_is_taken():
+    first = MetricsServer(Metrics(), port=0).start()
+    logged = []
+    try:
+        assert serve(Metrics(), first.host, first.port, lambda message, level: logged.append(level)) is None
+        assert logged == ["WARNING"]
+    finally:
+        first.close()
@@ -0,0 +1,116 @@
+import copy
+import json
+import os
+
+import pytest
+
+from capture import Box
+from flow import DEFAULT_FLOW, Flow, FlowRunner
+from locator import Match
+from metrics import Metrics
+
+VIDEO_FLOW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), DEFAULT_FLOW)
+
+with open(VIDEO_FLOW, encoding="utf-8") as f:
+    VIDEO = json.load(f)
+
+
+def broken(change):
+    """The video flow with ``change`` applied to a copy of its definition."""
+    data = copy.deepcopy(VIDEO)
+    change(data)
+    return data
+
+
+def run(found, max_steps=50):
+    """Run the video flow, where ``found`` maps state names to the template its wait finds.
+
+    Returns (result, actions taken, events raised).
+    """
+    flow = Flow.from_dict(VIDEO)
+    actions, events = [], []
+
+    def wait(state):
+        name = found.get(state.name)
+        return Match(name, Box(10, 20, 30, 40), 0.9) if name else None
+
+    runner = FlowRunner(flow, wait=wait,
+                        click=lambda match: actions.append(("click", match.name)),
+                        press=lambda key: actions.append(("press", key)),
+                        log=lambda message, level: None, on_event=events.append,
+                        settle=lambda seconds, box: actions.append(("settle", seconds, box)),
+                        max_steps=max_steps)
+    return runner.run(), actions, events
+
+
+def test_video_flow_loads():
+    flow = Flow.load(VIDEO_FLOW)
+    assert flow.start == "find_play"
+    assert flow.interrupts_for(flow.states["find_play"]) == {"sign_in.png": 0.8}
+    assert flow.interrupts_for(flow.states["signed_out"]) == {}
+    assert Flow.from_dict(flow.to_dict()) == flow
+
+
+@pytest.mark.parametrize("change", [
+    lambda data: data.update(start="nowhere"),
+    lambda data: data["states"]["find_play"]["on_found"].update(next="nowhere"),
+    lambda data: data["states"]["find_play"]["on_found"].update(action="double_click"),
+    lambda data: data["states"]["wait_end"]["on_found"].pop("key"),
+    lambda data: data["states"]["find_play"].update(wait_for=[]),
+    lambda data: data["states"]["find_play"]["on_timeout"].pop("next"),
+    lambda data: data["interrupts"]["sign_in.png"]["on_found"].update(result="maybe"),
+    lambda data: data["states"]["find_play"].update(poll="fats"),
+    lambda data: data["states"]["find_play"].update(poll={"type": "backoff", "initail": 1}),
+    lambda data: data["states"]["wait_end"].update(progress={"sparce": 5}),
+    lambda data: data["states"]["wait_end"].update(progress={"region": [0, 1000]}),
+])
+def test_validate_rejects_broken_flows(change):
+    with pytest.raises(ValueError):
+        Flow.from_dict(broken(change))
+
+
+def test_full_cycle():
+    result, actions, events = run({"find_play": "play.png", "find_fullscreen": "fullscreen.png",
+                                   "wait_end": "out.png", "find_next": "next2.png"})
+    assert result is True
+    assert actions == [("click", "play.png"), ("settle", 2, Box(10, 20, 30, 40)),
+                       ("click", "fullscreen.png"),
+                       ("press", "esc"), ("settle", 2, None),
+                       ("click", "next2.png"), ("settle", 2, Box(10, 20, 30, 40))]
+    assert events == []
+
+
+def test_none_video_skips_to_next():
+    result, actions, events = run({"find_next": "next1.png"})
+    assert result is True
+    assert actions[0] == ("click", "next1.png")
+    assert events == ["none_video"]
+
+
+def test_interrupt_takes_its_own_transition():
+    result, actions, events = run({"find_play": "sign_in.png"})
+    assert result is False
+    assert actions == []
+    assert events == ["signed_out"]
+
+
+def test_max_steps_ends_a_loop():
+    # Signed out forever: find_play -> signed_out -> find_play -> ...
+    result, _, _ = run({"find_play": "sign_in.png", "signed_out": "play.png"}, max_steps=6)
+    assert result is False
+
+
+def test_steps_are_timed_on_the_given_clock():
+    flow = Flow.from_dict(VIDEO)
+    now = [0.0]
+
+    def wait(state):
+        now[0] += 30.0
+        return None
+
+    metrics = Metrics()
+    runner = FlowRunner(flow, wait=wait, click=lambda match: None, press=lambda key: None,
+                        log=lambda message, level: None, metrics=metrics, clock=lambda: now[0])
+    assert runner.run() is False
+    steps = [h for h in metrics.snapshot()["histograms"] if h["name"] == "step_seconds"]
+    assert {h["labels"]["state"]: h["sum"] for h in steps} == {"find_play": 30.0, "find_next": 30.0}
@@ -0,0 +1,69 @@
+import pytest
+
+import inputs
+from inputs import Input, StubInput
+from metrics import Metrics
+from replay import VirtualClock
+
+
+class SlowStub(StubInput):
+    """A stub backend where every action takes 10 ms and a flush 20 ms of ``clock`` time."""
+
+    def __init__(self, clock):
+        super().__init__(clock.monotonic)
+        self.virtual = clock
+        self.flushes = []
+
+    def _record(self, kind, *args):
+        self.virtual.sleep(0.01)
+        super()._record(kind, *args)
+
+    def flush(self):
+        self.virtual.sleep(0.02)
+        self.flushes.append(len(self.actions))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = VirtualClock()
+    monkeypatch.setattr(inputs.time, "perf_counter", clock.monotonic)
+    return clock
+
+
+def histogram(metrics, name, **labels):
+    return next(h for h in metrics.snapshot()["histograms"]
+                if h["name"] == name and h["labels"] == {k: str(v) for k, v in labels.items()})
+
+
+def test_batch_runs_in_order_and_leaves_pauses_out(clock):
+    backend, metrics, slept = SlowStub(clock), Metrics(), []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock.sleep(seconds)
+
+    total = Input(backend, metrics=metrics, sleep=sleep).batch() \
+        .move(10, 20).click(10, 20).pause(0.5).press("esc").send()
+
+    assert [(action["input"], action["args"]) for action in backend.actions] == \
+        [("move", [10, 20]), ("click", [10, 20]), ("press", ["esc"])]
+    # Flushed before the pause and once at the end
+    assert backend.flushes == [2, 3]
+    assert slept == [0.5]
+    assert backend.actions[2]["t"] == pytest.approx(0.55)
+    assert total == pytest.approx(0.07)
+    assert histogram(metrics, "input_batch_seconds")["sum"] == pytest.approx(0.07)
+    # move and click share the 40 ms it took to send them
+    assert histogram(metrics, "input_seconds", action="move")["sum"] == pytest.approx(0.02)
+    assert histogram(metrics, "input_seconds", action="click")["sum"] == pytest.approx(0.02)
+    assert histogram(metrics, "input_seconds", action="press")["sum"] == pytest.approx(0.03)
+
+
+def test_single_actions_flush_right_away(clock):
+    backend, metrics = SlowStub(clock), Metrics()
+    layer = Input(backend, metrics=metrics, sleep=clock.sleep)
+    assert layer.click(1, 2) == pytest.approx(0.03)
+    assert layer.press("enter") == pytest.approx(0.03)
+    assert backend.flushes == [1, 2]
+    assert layer.latency == {"click": pytest.approx(0.03), "press": pytest.approx(0.03)}
+    assert not any(h["name"] == "input_batch_seconds" for h in metrics.snapshot()["histograms"])
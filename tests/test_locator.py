@@ -0,0 +1,68 @@
+import json
+import os
+
+import numpy as np
+
+from bench.synth import make_screen
+from capture import Box, FileCapture, clip, crop
+from locator import Locator, RegionMemory
+from templates import TemplateRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_clip_to_frame():
+    assert clip(Box(-10, 5, 30, 30), 100, 100) == Box(0, 5, 20, 30)
+    assert clip(Box(90, 90, 30, 30), 100, 100) == Box(90, 90, 10, 10)
+    assert clip(Box(3000, 2000, 50, 50), 100, 100) is None
+    frame = np.zeros((80, 100, 3), dtype=np.uint8)
+    assert crop(frame, Box(3000, 2000, 50, 50)).shape == frame.shape
+
+
+def test_positions_from_another_screen_size_are_ignored(tmp_path):
+    templates = TemplateRegistry(ROOT, profiles={"play.png": "gray"})
+    screen, placed = make_screen(1280, 720, templates, ["play.png"])
+    path = str(tmp_path / "positions.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"boxes": {"3840x2160": {"play.png": [3000, 2000, 83, 89]},
+                             "1280x720": {"out.png": [3000, 2000, 116, 96]}}}, f)
+    memory = RegionMemory(path)
+    locator = Locator(templates, memory, backend=FileCapture([screen]))
+
+    match = locator.locate_any(["play.png"])
+    assert match.box == placed["play.png"]
+    assert memory.get("1280x720", "play.png") == placed["play.png"]
+    assert memory.get("3840x2160", "play.png") == Box(3000, 2000, 83, 89)
+    # A stale region off this screen grabs the whole frame instead of nothing
+    assert locator.capture(locator.search_region("out.png")).shape == screen.shape
+
+
+def test_interrupt_wins_over_a_lookalike_and_nothing_is_learned():
+    templates = TemplateRegistry(ROOT, names=("next1.png", "next2.png", "sign_in.png"))
+    plain, _ = make_screen(1280, 720, templates, [])
+    sign_in, placed = make_screen(1280, 720, templates, ["sign_in.png", "next1.png"], background=plain)
+    memory = RegionMemory(None)
+    # Only every 5th poll searches interrupts in full; the second poll relies on the check before learning
+    locator = Locator(templates, memory, backend=FileCapture([plain, sign_in]), interrupt_every=5)
+    interrupts = {"sign_in.png": 0.8}
+
+    assert locator.locate_any(["next1.png", "next2.png"], 0.7, interrupts=interrupts) is None
+    assert locator.match(sign_in, "next1.png", 0.7) is not None
+    match = locator.locate_any(["next1.png", "next2.png"], 0.7, interrupts=interrupts)
+    assert match.name == "sign_in.png"
+    assert match.box == placed["sign_in.png"]
+    assert memory.get("1280x720", "next1.png") is None
+    assert memory.get("1280x720", "sign_in.png") == placed["sign_in.png"]
+
+
+def test_full_interrupt_search_on_request():
+    templates = TemplateRegistry(ROOT, names=("next1.png", "sign_in.png"))
+    plain, _ = make_screen(1280, 720, templates, [])
+    sign_in, _ = make_screen(1280, 720, templates, ["sign_in.png"], background=plain)
+    locator = Locator(templates, RegionMemory(None), backend=FileCapture([plain, sign_in, sign_in]),
+                      interrupt_every=5)
+    interrupts = {"sign_in.png": 0.8}
+    assert locator.locate_any(["next1.png"], interrupts=interrupts) is None
+    # Not a 5th poll and nothing else found: only a forced search sees the sign-in page
+    assert locator.locate_any(["next1.png"], interrupts=interrupts) is None
+    assert locator.locate_any(["next1.png"], interrupts=interrupts, full_interrupts=True).name == "sign_in.png"
@@ -0,0 +1,63 @@
+import pytest
+
+from polling import Backoff, Fixed, PollScheduler, strategy_from_config
+
+
+class FakeClock:
+    """A clock that only moves when slept on."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_backoff_grows_to_cap_and_resets():
+    strategy = Backoff(initial=0.5, factor=2.0, cap=3.0, fast_for=1.0, fast_interval=0.1)
+    assert strategy.next_interval(0.5) == 0.1
+    assert [strategy.next_interval(2.0) for _ in range(4)] == [0.5, 1.0, 2.0, 3.0]
+    strategy.reset()
+    assert strategy.next_interval(2.0) == 0.5
+
+
+def test_scheduler_returns_hit_with_latency():
+    clock = FakeClock()
+    results = iter([None, None, "found"])
+    scheduler = PollScheduler(Fixed(0.5), clock=clock, sleep=clock.sleep)
+    assert scheduler.wait(lambda: next(results), timeout=10) == "found"
+    assert scheduler.stats.polls == 3
+    assert scheduler.stats.found
+    assert scheduler.stats.latency == 0.5
+    assert clock.now == 1.0
+
+
+def test_scheduler_never_sleeps_past_timeout():
+    clock = FakeClock()
+    scheduler = PollScheduler(Fixed(2.0), clock=clock, sleep=clock.sleep)
+    assert scheduler.wait(lambda: None, timeout=5) is None
+    assert clock.sleeps == [2.0, 2.0, 1.0]
+    assert scheduler.stats.polls == 3
+    assert not scheduler.stats.found
+
+
+def test_scheduler_stops_when_asked():
+    clock = FakeClock()
+    scheduler = PollScheduler(Fixed(1.0), clock=clock, sleep=clock.sleep)
+    assert scheduler.wait(lambda: None, timeout=60, keep_going=lambda: clock.now < 3) is None
+    assert scheduler.stats.polls == 3
+
+
+def test_strategy_from_config():
+    assert isinstance(strategy_from_config(None), Fixed)
+    assert isinstance(strategy_from_config("fast"), Backoff)
+    assert strategy_from_config({"type": "fixed", "interval": 2.0}).interval == 2.0
+    with pytest.raises(ValueError):
+        strategy_from_config("fats")
+    with pytest.raises(ValueError):
+        strategy_from_config({"type": "sometimes"})
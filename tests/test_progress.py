@@ -0,0 +1,33 @@
+from capture import Box
+from polling import Fixed
+from progress import PlaybackEnd, ProgressEstimator
+
+
+def estimator(readings, every=30.0):
+    """An estimator with ``readings`` already taken ``every`` seconds apart on a 1000 px bar."""
+    estimate = ProgressEstimator(locator=None, clock=lambda: every * (len(readings) - 1),
+                                 region=Box(0, 1000, 1000, 6))
+    estimate.samples = [(every * i, fraction) for i, fraction in enumerate(readings)]
+    return estimate
+
+
+def test_paused_video_jitter_falls_back():
+    # The fit slopes up a little but the fill hasn't moved: no usable estimate
+    estimate = estimator([0.500, 0.499, 0.499, 0.500, 0.500])
+    estimate.sample = lambda: None
+    assert estimate.remaining() is not None
+    assert estimate.uncertainty() is None
+    seen = []
+    strategy = PlaybackEnd(estimate, Fixed(1.0), on_estimate=seen.append)
+    assert strategy.next_interval(0.0) == 1.0
+    assert strategy.expected is None
+    assert seen == [None]
+
+
+def test_moving_bar_predicts_end():
+    estimate = estimator([0.10, 0.15, 0.20])
+    estimate.sample = lambda: None
+    strategy = PlaybackEnd(estimate, Fixed(1.0))
+    strategy.next_interval(0.0)
+    assert abs(strategy.expected - 480.0) < 1e-6
+    assert strategy.next_interval(0.0) == strategy.sparse
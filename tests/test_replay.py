@@ -0,0 +1,52 @@
+import os
+
+from bench.synth import make_screen
+from capture import FileCapture
+from engine import Engine
+from events import EventLog
+from inputs import StubInput
+from locator import RegionMemory
+from replay import Recorder, RecordingCapture, RecordingInput, VirtualClock, replay
+from templates import TemplateRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def record(path):
+    """Record one cycle of the video flow against a synthetic screen showing every button.
+
+    Returns the inputs the live run made.
+    """
+    templates = TemplateRegistry(ROOT)
+    screen, _ = make_screen(1280, 720, templates, ["play.png", "fullscreen.png", "out.png", "next1.png"])
+    clock = VirtualClock()
+    recorder = Recorder(path, clock=clock.monotonic)
+    session = dict(flow=os.path.join(ROOT, "flows", "video.json"), templates=ROOT, capture="file",
+                   origin=[0, 0], start_delay=5.0)
+    recorder.write_session(**session)
+    inputs = StubInput(clock.monotonic)
+    engine = Engine(session["flow"], log=lambda message, level="INFO": None, templates=templates,
+                    events=EventLog(os.path.join(path, "events.jsonl")).start(),
+                    backend=RecordingCapture(FileCapture([screen]), recorder),
+                    input_backend=RecordingInput(inputs, recorder), workers=1, memory=RegionMemory(None),
+                    clock=clock.monotonic, sleep=clock.sleep)
+    assert engine.load_flow()
+    engine.load_templates()
+    recorder.write_snapshot(engine.flow, engine.locator.memory)
+    engine.run(max_cycles=1)
+    engine.close()
+    recorder.write_session(cycles=engine.cycle_count, **session)
+    recorder.close()
+    return inputs.actions
+
+
+def test_recorded_run_replays_without_mismatches(tmp_path):
+    path = str(tmp_path / "run")
+    live = record(path)
+    assert [action["input"] for action in live] == ["click", "click", "press", "click"]
+
+    report = replay(path)
+    assert report["mismatches"] == []
+    assert report["cycles"] == 1
+    assert report["successes"] == 1
+    assert report["inputs"] == live
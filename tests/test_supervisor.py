@@ -0,0 +1,51 @@
+import pytest
+
+import supervisor
+from supervisor import Supervisor
+
+
+def fake_session(index, display, options, updates):
+    """Reports growing counters the way run_session does, without an engine."""
+    for cycle in range(1, options["cycles"] + 1):
+        counters = [("cycles", {"result": "success"}, float(cycle)),
+                    ("cycles", {"result": "failure"}, float(index)),
+                    ("flow_events", {"event": "none_video"}, 1.0)]
+        updates.put((index, counters, cycle == options["cycles"]))
+
+
+def test_sessions_are_aggregated_by_delta():
+    logged = []
+    sup = Supervisor(2, {"cycles": 3}, xvfb=False, target=fake_session,
+                     log=lambda message, level="INFO": logged.append(message))
+    sup.start()
+    try:
+        for _ in range(50):
+            sup.poll(timeout=0.2)
+            if not sup.running:
+                break
+    finally:
+        sup.stop()
+    assert sup.running == 0
+    assert sup.sessions[0]["display"] == ":99"
+    assert sup.sessions[1]["display"] == ":100"
+    assert sup.sessions[0]["cycles"] == 3 and sup.sessions[1]["cycles"] == 4
+    assert sup.sessions[1]["successes"] == 3
+
+    counters = {(name, labels): value for (name, labels), value in sup.metrics.counters.items()}
+    # Reported totals 1, 2, 3 add up to 3, not 6
+    assert counters[("cycles", (("result", "success"), ("session", "0")))] == 3
+    assert counters[("cycles", (("result", "failure"), ("session", "1")))] == 1
+    assert ("cycles", (("result", "failure"), ("session", "0"))) not in counters
+    assert counters[("flow_events", (("event", "none_video"), ("session", "1")))] == 1
+
+    status = sup.status()
+    assert status.startswith("0/2 sessions running | cycles 7 (6 ok) | none videos 2")
+    assert status.endswith("per session 0:3 1:4")
+    assert sup.summary()["totals"]["cycles"] == 7
+
+
+def test_display_in_use_is_refused(monkeypatch):
+    monkeypatch.setattr(supervisor.os.path, "exists", lambda path: path == "/tmp/.X99-lock")
+    monkeypatch.setattr(supervisor.subprocess, "Popen", lambda *args, **kwargs: pytest.fail("Xvfb started"))
+    with pytest.raises(RuntimeError, match="already in use"):
+        supervisor.start_display(99)